@@ -20,6 +20,7 @@ The simulation runs for thousands of steps, generating realistic token price mov
 affiliate earnings, and market behavior patterns that can be analyzed for optimal
 system design and parameter tuning.
 """
+import os
 import time
 import logging
 import pandas as pd
@@ -52,6 +53,8 @@ MOVING_AVERAGE_WINDOW = 50  # Increased window for smoother price adjustments
 PRICE_IMPACT_FACTOR = 0.01  # Reduced impact factor
 BONDING_CURVE_TYPE_CHANGE_INTERVAL = 500 # Increased interval
 BONDING_CURVE_PARAM_CHANGE_INTERVAL = 150 # Reduced interval for more frequent parameter tweaks
+# Final affiliate balances for the governance-dao voter population, next to output.txt
+HOLDINGS_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'holdings.npy')
 
 # Variable bonding curve change intervals for each token
 bonding_curve_change_intervals = np.random.choice(
@@ -476,6 +479,12 @@ def analyze_results(token_histories, affiliate_histories):
 
     return affiliate_earnings
 
+def save_holdings_snapshot(affiliate_earnings, path=HOLDINGS_SNAPSHOT_PATH):
+    """Save final base-currency balances, ordered by affiliate id, as a float64 .npy snapshot."""
+    balances = np.array([affiliate_earnings[aff_id] for aff_id in sorted(affiliate_earnings)], dtype=np.float64)
+    np.save(path, balances)
+    logging.info(f"Saved {len(balances)} affiliate holdings to {path}")
+
 def plot_token_simulation(token_histories):
     plt.figure(figsize=(12, 6))
     for token_name in token_histories:
@@ -562,6 +571,7 @@ def plot_affiliate_simulation(affiliate_histories, affiliates):
         plt.show()
 
 affiliate_earnings = analyze_results(token_histories, affiliate_histories)
+save_holdings_snapshot(affiliate_earnings)
 plot_token_simulation(token_histories)
 plot_affiliate_simulation(affiliate_histories, affiliates)
 
@@ -23,6 +23,11 @@ import matplotlib.pyplot as plt
 import random
 import os
 
+try:
+    import numba
+except ImportError:  # Numba is optional; curves then run as plain NumPy
+    numba = None
+
 # --- Configuration ---
 NUM_AGENTS = 100  # Reduced for faster optimization
 SIMULATION_STEPS = 500  # Reduced for faster optimization
@@ -40,35 +45,173 @@ AGENT_MEMORY_SIZE = 10
 AGENT_TREND_THRESHOLD = 0.01
 AGENT_TREND_DELAY = 2
 
+# Optimizer trials: seed for common random numbers (None = independent draws)
+# and number of shared burn-in steps (0 = every trial starts from step 0)
+OPTIMIZER_CRN_SEED = 0
+OPTIMIZER_WARM_START_STEPS = 0
+OPTIMIZER_STRESS_PATHS = 200  # Paths per scenario when a stress objective is optimized
+
+# Agent history capture for the final run
+HISTOGRAM_TIMEPOINTS = 5
+SNAPSHOT_STRIDE = 100  # Extra full snapshots every N steps (0 disables)
+SNAPSHOT_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+SNAPSHOT_DIR = None  # Set to a directory to memory-map snapshots to disk
+
 # --- Model Definition ---
 # --- Bonding Curve Functions ---
+# Price and integral functions use NumPy ufuncs only, so they vectorize over supply
+# arrays and compile unchanged under Numba. Parameters follow the order of the
+# curve's `defaults`.
+def _linear_price(supply, m, b):
+    return m * supply + b
+
+def _linear_integral(supply, m, b):
+    return m * supply ** 2 / 2 + b * supply
+
+def _exponential_price(supply, a, k):
+    return a * np.exp(k * supply)
+
+def _exponential_integral(supply, a, k):
+    return a / k * np.exp(k * supply)
+
+def _sigmoid_price(supply, k, s0, k_max):
+    return k_max / (1 + np.exp(-k * (supply - s0)))
+
+def _sigmoid_integral(supply, k, s0, k_max):
+    x = k * (supply - s0)
+    # Numerically stable softplus
+    return k_max / k * (np.maximum(x, 0.0) + np.log1p(np.exp(-np.abs(x))))
+
+def _multi_segment_price(supply, breakpoint, m, a, k):
+    lin = m * np.minimum(supply, breakpoint)
+    exp = a * np.exp(k * np.maximum(supply - breakpoint, 0.0))
+    return lin + exp
+
+def _multi_segment_integral(supply, breakpoint, m, a, k):
+    below = np.minimum(supply, breakpoint)
+    above = np.maximum(supply - breakpoint, 0.0)
+    return m * below ** 2 / 2 + m * breakpoint * above + a * below + a * (np.exp(k * above) - 1) / k
+
+def _bancor_price(supply, reserve_ratio, r0, s0):
+    # Constant reserve ratio: R(S) = r0 * (S / s0) ** (1 / cw) and P = R / (cw * S)
+    return r0 / (reserve_ratio * s0) * (supply / s0) ** (1 / reserve_ratio - 1)
+
+def _bancor_integral(supply, reserve_ratio, r0, s0):
+    return r0 * (supply / s0) ** (1 / reserve_ratio)
+
+# Composite Simpson weights (16 intervals) for curves registered without an integral
+_SIMPSON_NODES = np.linspace(0.0, 1.0, 17)
+_SIMPSON_WEIGHTS = np.array([1] + [4, 2] * 7 + [4, 1], dtype=np.float64) / 48
+
+class BondingCurve:
+    """A curve family: parameter defaults, optimizer bounds and price/integral functions.
+
+    Parameters listed in `bounds` are searched by the optimizer; the rest stay at
+    their defaults. `integral` is the antiderivative of `price` and is used for
+    exact trade costs; without it costs fall back to Simpson quadrature.
+    """
+
+    def __init__(self, name, defaults, bounds, price, integral=None, jit=True):
+        self.name = name
+        self.defaults = dict(defaults)
+        self.bounds = dict(bounds)
+        self.param_names = tuple(self.defaults)
+        self.price = price
+        self.integral = integral
+        self.jit = jit and numba is not None
+        self._compiled = None
+
+    def compiled(self):
+        if self._compiled is None:
+            if self.jit:
+                price = numba.njit(self.price)
+                integral = numba.njit(self.integral) if self.integral is not None else None
+            else:
+                price, integral = self.price, self.integral
+            self._compiled = (price, integral)
+        return self._compiled
+
+    def sample(self, rng=random):
+        params = {'type': self.name}
+        for name in self.param_names:
+            if name in self.bounds:
+                low, high = self.bounds[name]
+                params[name] = rng.uniform(low, high)
+        return params
+
+    def bind(self, params):
+        values = tuple(float(params.get(name, default)) for name, default in self.defaults.items())
+        return BoundCurve(self, values)
+
+class BoundCurve:
+    """A curve with its parameters resolved once, so evaluation skips type dispatch."""
+
+    def __init__(self, curve, values):
+        self.curve = curve
+        self.values = values
+        self.price_fn, self.integral_fn = curve.compiled()
+
+    @property
+    def params(self):
+        return {'type': self.curve.name, **dict(zip(self.curve.param_names, self.values))}
+
+    def price(self, supply):
+        if np.ndim(supply) == 0:
+            return self.price_fn(float(supply), *self.values)
+        return self.price_fn(np.asarray(supply, dtype=np.float64), *self.values)
+
+    def price_tensor(self, supply):
+        return tf.constant(self.price(float(supply)), dtype=tf.float32)
+
+    def cost(self, supply, amount):
+        """Reserve change for moving supply by `amount` (negative for sells)."""
+        supply = np.asarray(supply, dtype=np.float64)
+        amount = np.asarray(amount, dtype=np.float64)
+        if self.integral_fn is not None:
+            return self.integral_fn(supply + amount, *self.values) - self.integral_fn(supply, *self.values)
+        points = supply[..., None] + amount[..., None] * _SIMPSON_NODES
+        return amount * np.sum(self.price_fn(points, *self.values) * _SIMPSON_WEIGHTS, axis=-1)
+
+CURVE_REGISTRY = {}
+
+def register_curve(curve):
+    CURVE_REGISTRY[curve.name] = curve
+    return curve
+
+def get_curve(curve_type):
+    try:
+        return CURVE_REGISTRY[curve_type]
+    except KeyError:
+        raise ValueError(f"Invalid bonding curve type: {curve_type}") from None
+
+def bind_curve(params):
+    if isinstance(params, BoundCurve):
+        return params
+    return get_curve(params.get('type', 'linear')).bind(params)  # Default to linear if type is missing
+
+register_curve(BondingCurve(
+    'linear', {'m': 0.1, 'b': INITIAL_TOKEN_PRICE},
+    {'m': (0.01, 0.2), 'b': (0.5, 2.0)},
+    _linear_price, _linear_integral))
+register_curve(BondingCurve(
+    'exponential', {'a': 0.1, 'k': 0.01},
+    {'a': (0.01, 0.2), 'k': (0.005, 0.02)},
+    _exponential_price, _exponential_integral))
+register_curve(BondingCurve(
+    'sigmoid', {'k': 0.02, 's0': 100, 'k_max': 10},
+    {'k': (0.01, 0.05), 's0': (50, 150), 'k_max': (5, 15)},
+    _sigmoid_price, _sigmoid_integral))
+register_curve(BondingCurve(
+    'multi-segment', {'breakpoint': 200, 'm': 0.05, 'a': 0.1, 'k': 0.02},
+    {'breakpoint': (100, 300), 'm': (0.01, 0.1), 'a': (0.01, 0.2), 'k': (0.01, 0.03)},
+    _multi_segment_price, _multi_segment_integral))
+register_curve(BondingCurve(
+    'bancor', {'reserve_ratio': 0.5, 'r0': INITIAL_TOKEN_SUPPLY * INITIAL_TOKEN_PRICE * 0.5, 's0': INITIAL_TOKEN_SUPPLY},
+    {'reserve_ratio': (0.1, 0.9), 'r0': (10, 90)},
+    _bancor_price, _bancor_integral))
+
 def calculate_bonding_curve_price(supply, params):
-    supply = tf.cast(supply, tf.float32)
-    curve_type = params.get('type', 'linear')  # Default to linear if type is missing
-
-    if curve_type == 'linear':
-        m = params.get('m', 0.1)
-        b = params.get('b', INITIAL_TOKEN_PRICE)
-        return m * supply + b
-    elif curve_type == 'exponential':
-        a = params.get('a', 0.1)
-        k = params.get('k', 0.01)
-        return a * tf.exp(k * supply)
-    elif curve_type == 'sigmoid':
-        k = params.get('k', 0.02)
-        s0 = params.get('s0', 100)
-        k_max = params.get('k_max', 10)
-        return k_max / (1 + tf.exp(-k * (supply - s0)))
-    elif curve_type == 'multi-segment':
-        breakpoint = params.get('breakpoint', 200)
-        m = params.get('m', 0.05)
-        a = params.get('a', 0.1)
-        k = params.get('k', 0.02)
-        lin = m * tf.minimum(supply, breakpoint)
-        exp = a * tf.exp(k * tf.maximum(supply - breakpoint, 0))
-        return lin + exp
-    else:
-        raise ValueError("Invalid bonding curve type")
+    return bind_curve(params).price_tensor(supply)
 
 # --- Agent State ---
 class Agent:
@@ -82,11 +225,15 @@ class Agent:
     def update_memory(self, current_price):
         self.price_memory.assign(tf.concat([self.price_memory[1:], [current_price]], axis=0))
 
-    def trade(self, current_supply, current_step, bonding_curve_params):
-        if random.random() < AGENT_TRADE_FREQUENCY and current_step > (self.last_trade_step + AGENT_TREND_DELAY):
-            trade_size = random.uniform(
-                AGENT_TRADE_SIZE_RANGE[0], AGENT_TRADE_SIZE_RANGE[1]
-            )
+    def trade(self, current_supply, current_step, bonding_curve_params, draw=None, trade_size=None):
+        # `draw` and `trade_size` come from a RandomStream when running with common random numbers
+        if draw is None:
+            draw = random.random()
+        if draw < AGENT_TRADE_FREQUENCY and current_step > (self.last_trade_step + AGENT_TREND_DELAY):
+            if trade_size is None:
+                trade_size = random.uniform(
+                    AGENT_TRADE_SIZE_RANGE[0], AGENT_TRADE_SIZE_RANGE[1]
+                )
 
             current_price = calculate_bonding_curve_price(current_supply, bonding_curve_params)
 
@@ -116,165 +263,717 @@ class Agent:
 
         return None, 0
 
+# --- Run Metrics ---
+# Objectives reported by RunMetrics; the sense flips maximised metrics so every
+# entry of an objective vector is minimised. The stress_* objectives are the
+# worst tail across stress scenarios (see stress_objectives) and are opt-in.
+OBJECTIVE_NAMES = ['volatility', 'slippage', 'reserve_ratio', 'gini', 'hhi', 'agent_pnl']
+OBJECTIVE_SENSE = {
+    'volatility': 1.0,
+    'slippage': 1.0,
+    'reserve_ratio': -1.0,
+    'gini': 1.0,
+    'hhi': 1.0,
+    'agent_pnl': -1.0,
+    'stress_volatility': 1.0,
+    'stress_drawdown': 1.0,
+    'stress_reserve_ratio': -1.0,
+    'stress_slippage': 1.0,
+}
+
+class RunMetrics:
+    """Accumulates run statistics step by step without keeping per-step agent state.
+
+    The reserve starts at the curve integral up to `supply`, the backing of the
+    tokens already issued, and the reserve ratio compares it with the market cap
+    at the post-trade price, as in run_stress_paths.
+    """
+
+    def __init__(self, curve, supply=None):
+        self.curve = bind_curve(curve)
+        supply = INITIAL_TOKEN_SUPPLY if supply is None else supply
+        self.steps = 0
+        self.price_mean = 0.0
+        self.price_m2 = 0.0
+        self.traded_volume = 0.0
+        self.weighted_slippage = 0.0
+        self.reserve = float(self.curve.cost(0.0, float(supply)))
+        self.reserve_ratio = 0.0
+        self.min_reserve_ratio = float('inf')
+
+    def record_trade(self, quoted_price, execution_price, amount, reserve_flow):
+        amount = float(amount)
+        quoted_price = float(quoted_price)
+        if quoted_price > 0:
+            self.weighted_slippage += amount * abs(float(execution_price) - quoted_price) / quoted_price
+        self.traded_volume += amount
+        self.reserve += float(reserve_flow)
+
+    def record_step(self, price, supply):
+        price = float(price)
+        # Welford update so the price std needs no history
+        self.steps += 1
+        delta = price - self.price_mean
+        self.price_mean += delta / self.steps
+        self.price_m2 += delta * (price - self.price_mean)
+
+        supply = float(supply)
+        market_cap = float(self.curve.price(supply)) * supply
+        self.reserve_ratio = self.reserve / market_cap if market_cap > 0 else 0.0
+        self.min_reserve_ratio = min(self.min_reserve_ratio, self.reserve_ratio)
+
+    def finalize(self, capitals, tokens, price):
+        capitals = np.asarray(capitals, dtype=np.float64)
+        tokens = np.asarray(tokens, dtype=np.float64)
+        total_tokens = tokens.sum()
+        if total_tokens > 0:
+            shares = tokens / total_tokens
+            hhi = float(np.sum(shares ** 2))
+        else:
+            hhi = 0.0
+        pnl = capitals + tokens * float(price) - INITIAL_AGENT_CAPITAL
+        return {
+            'volatility': float(np.sqrt(self.price_m2 / self.steps)) if self.steps else 0.0,
+            'slippage': self.weighted_slippage / self.traded_volume if self.traded_volume > 0 else 0.0,
+            'reserve_ratio': self.reserve_ratio,
+            'min_reserve_ratio': self.min_reserve_ratio if self.steps else 0.0,
+            'gini': gini_coefficient(tokens),
+            'hhi': hhi,
+            'agent_pnl': float(np.mean(pnl)) if len(pnl) else 0.0,
+            'loss_fraction': float(np.mean(pnl < 0)) if len(pnl) else 0.0,
+        }
+
+def gini_coefficient(values):
+    values = np.sort(np.asarray(values, dtype=np.float64))
+    n = len(values)
+    total = values.sum()
+    if n < 2 or total <= 0:
+        return 0.0
+    ranks = np.arange(1, n + 1)
+    return float(2 * np.sum(ranks * values) / (n * total) - (n + 1) / n)
+
+def objective_vector(metrics, objectives=OBJECTIVE_NAMES):
+    return np.array([OBJECTIVE_SENSE[name] * metrics[name] for name in objectives])
+
+def pareto_front(objective_matrix):
+    """Indices of the non-dominated rows of an (n_trials, n_objectives) minimisation matrix."""
+    points = np.asarray(objective_matrix, dtype=np.float64)
+    no_worse = np.all(points[:, None, :] >= points[None, :, :], axis=2)
+    better = np.any(points[:, None, :] > points[None, :, :], axis=2)
+    dominated = np.any(no_worse & better, axis=1)
+    return np.flatnonzero(~dominated)
+
+# --- Snapshot Recording ---
+class SnapshotRecorder:
+    """Full agent snapshots at selected steps plus per-step means and quantiles.
+
+    Snapshot buffers are preallocated (or memory-mapped when `path` is given), so
+    memory grows with the number of snapshots rather than the number of steps.
+    """
+
+    def __init__(self, num_steps, num_agents, timepoints=(), stride=0, quantiles=SNAPSHOT_QUANTILES, path=None):
+        snapshot_steps = {int(t) for t in timepoints}
+        if stride:
+            snapshot_steps.update(range(0, num_steps, stride))
+        self.snapshot_steps = np.array(sorted(t for t in snapshot_steps if 0 <= t < num_steps), dtype=np.int64)
+        self._slots = {int(t): i for i, t in enumerate(self.snapshot_steps)}
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+
+        shape = (len(self.snapshot_steps), num_agents)
+        if path is None:
+            self.capital = np.zeros(shape, dtype=np.float32)
+            self.tokens = np.zeros(shape, dtype=np.float32)
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.capital = np.lib.format.open_memmap(os.path.join(path, 'capital.npy'), mode='w+', dtype=np.float32, shape=shape)
+            self.tokens = np.lib.format.open_memmap(os.path.join(path, 'tokens.npy'), mode='w+', dtype=np.float32, shape=shape)
+
+        self.capital_mean = np.zeros(num_steps, dtype=np.float32)
+        self.token_mean = np.zeros(num_steps, dtype=np.float32)
+        self.capital_quantiles = np.zeros((num_steps, len(self.quantiles)), dtype=np.float32)
+        self.token_quantiles = np.zeros((num_steps, len(self.quantiles)), dtype=np.float32)
+
+    def record(self, step, capitals, tokens):
+        capitals = np.asarray(capitals, dtype=np.float32)
+        tokens = np.asarray(tokens, dtype=np.float32)
+        self.capital_mean[step] = capitals.mean()
+        self.token_mean[step] = tokens.mean()
+        self.capital_quantiles[step] = np.quantile(capitals, self.quantiles)
+        self.token_quantiles[step] = np.quantile(tokens, self.quantiles)
+
+        slot = self._slots.get(step)
+        if slot is not None:
+            self.capital[slot] = capitals
+            self.tokens[slot] = tokens
+
+    def snapshot(self, step):
+        slot = self._slots[int(step)]
+        return self.capital[slot], self.tokens[slot]
+
+    def flush(self):
+        for buffer in (self.capital, self.tokens):
+            if isinstance(buffer, np.memmap):
+                buffer.flush()
+
 # --- Global State ---
 supply = tf.Variable(INITIAL_TOKEN_SUPPLY, dtype=tf.float32)
 agents = [] # Agents will be created per simulation run
 
+class RandomStream:
+    """Pre-drawn agent randomness (trade-frequency draws and trade sizes), indexed by step and agent.
+
+    Sharing one stream across optimizer trials gives every candidate curve the
+    same common random numbers, so objective differences reflect the curve.
+    """
+
+    def __init__(self, num_steps, num_agents, seed=None):
+        rng = np.random.default_rng(seed)
+        self.trade_draws = rng.random((num_steps, num_agents))
+        self.trade_sizes = rng.uniform(AGENT_TRADE_SIZE_RANGE[0], AGENT_TRADE_SIZE_RANGE[1], (num_steps, num_agents))
+
+def reset_simulation(num_agents=None):
+    global supply, agents
+    supply = tf.Variable(INITIAL_TOKEN_SUPPLY, dtype=tf.float32)
+    agents = [Agent(i) for i in range(NUM_AGENTS if num_agents is None else num_agents)]
+
+def agent_arrays():
+    capitals = tf.stack([agent.capital for agent in agents]).numpy()
+    tokens = tf.stack([agent.tokens for agent in agents]).numpy()
+    return capitals, tokens
+
+class SimulationState:
+    """Serializable snapshot of the global simulation: supply, agent arrays, RNG state and step."""
+
+    def __init__(self, step, supply, capital, tokens, price_memory, last_trade_step, rng_state):
+        self.step = step
+        self.supply = supply
+        self.capital = capital
+        self.tokens = tokens
+        self.price_memory = price_memory
+        self.last_trade_step = last_trade_step
+        self.rng_state = rng_state
+
+    @classmethod
+    def capture(cls, step):
+        """Capture the current globals; `step` is the next step to simulate."""
+        capitals, tokens = agent_arrays()
+        return cls(
+            step,
+            float(supply.numpy()),
+            capitals,
+            tokens,
+            tf.stack([agent.price_memory for agent in agents]).numpy(),
+            tf.stack([agent.last_trade_step for agent in agents]).numpy(),
+            random.getstate(),
+        )
+
+    def restore(self):
+        """Overwrite the globals with this state and return the next step to simulate."""
+        global supply, agents
+        supply = tf.Variable(self.supply, dtype=tf.float32)
+        agents = [Agent(i) for i in range(len(self.capital))]
+        for i, agent in enumerate(agents):
+            agent.capital.assign(self.capital[i])
+            agent.tokens.assign(self.tokens[i])
+            agent.price_memory.assign(self.price_memory[i])
+            agent.last_trade_step.assign(self.last_trade_step[i])
+        random.setstate(self.rng_state)
+        return self.step
+
+    def save(self, path):
+        version, internal, gauss_next = self.rng_state
+        np.savez(
+            path,
+            step=self.step,
+            supply=self.supply,
+            capital=self.capital,
+            tokens=self.tokens,
+            price_memory=self.price_memory,
+            last_trade_step=self.last_trade_step,
+            rng_version=version,
+            rng_internal=np.array(internal, dtype=np.int64),
+            rng_gauss_next=np.nan if gauss_next is None else gauss_next,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            gauss_next = float(data['rng_gauss_next'])
+            rng_state = (
+                int(data['rng_version']),
+                tuple(int(x) for x in data['rng_internal']),
+                None if np.isnan(gauss_next) else gauss_next,
+            )
+            return cls(
+                int(data['step']),
+                float(data['supply']),
+                data['capital'],
+                data['tokens'],
+                data['price_memory'],
+                data['last_trade_step'],
+                rng_state,
+            )
+
 # --- Simulation Step ---
-def simulation_step(current_step, bonding_curve_params):
+def simulation_step(current_step, bonding_curve_params, metrics=None, stream=None):
     global supply, agents
+    curve = bind_curve(bonding_curve_params)
     trades = []
-    current_price = calculate_bonding_curve_price(supply, bonding_curve_params)
+    current_price = curve.price_tensor(supply)
 
     for agent in agents:
         agent.update_memory(current_price)
 
-    for agent in agents:
-        trade_type, trade_amount = agent.trade(supply, current_step, bonding_curve_params)
+    for i, agent in enumerate(agents):
+        if stream is None:
+            trade_type, trade_amount = agent.trade(supply, current_step, curve)
+        else:
+            trade_type, trade_amount = agent.trade(
+                supply, current_step, curve, stream.trade_draws[current_step, i], stream.trade_sizes[current_step, i]
+            )
         if trade_type is not None:
             trades.append((agent, trade_type, trade_amount))
 
     for agent, trade_type, trade_amount in trades:
         if trade_type == "buy":
-            price = calculate_bonding_curve_price(supply, bonding_curve_params) * (1 + TRADING_FEE)
+            price = curve.price_tensor(supply) * (1 + TRADING_FEE)
             cost = trade_amount * price
             if agent.capital >= cost:
+                if metrics is not None:
+                    metrics.record_trade(current_price, price / (1 + TRADING_FEE), trade_amount, cost)
                 agent.capital.assign_sub(cost)
                 agent.tokens.assign_add(trade_amount)
                 supply.assign_add(trade_amount)
 
         elif trade_type == "sell":
-            price = calculate_bonding_curve_price(supply, bonding_curve_params) * (1 - TRADING_FEE)
+            price = curve.price_tensor(supply) * (1 - TRADING_FEE)
             revenue = trade_amount * price
+            if metrics is not None:
+                metrics.record_trade(current_price, price / (1 - TRADING_FEE), trade_amount, -revenue)
             agent.capital.assign_add(revenue)
             agent.tokens.assign_sub(trade_amount)
             supply.assign_sub(trade_amount)
 
+    if metrics is not None:
+        metrics.record_step(current_price, supply)
+
     return supply, [agent.capital for agent in agents], [
         agent.tokens for agent in agents
     ], current_price
 
+def run_steps(bonding_curve_params, start_step, num_steps, metrics=None, stream=None):
+    current_price = None
+    for step in range(start_step, start_step + num_steps):
+        _, _, _, current_price = simulation_step(step, bonding_curve_params, metrics, stream)
+    return current_price
+
+def fork_runs(state, params, num_steps, num_branches, seed=None):
+    """Continue `num_branches` what-if runs from a common state.
+
+    Each branch restores `state` and is reseeded with `seed + branch` (or left on the
+    captured RNG stream when `seed` is None). Metrics cover the continuation only.
+    """
+    curve = bind_curve(params)
+    results = []
+    for branch in range(num_branches):
+        start_step = state.restore()
+        if seed is not None:
+            random.seed(seed + branch)
+        metrics = RunMetrics(curve, float(supply.numpy()))
+        current_price = run_steps(curve, start_step, num_steps, metrics)
+        results.append(metrics.finalize(*agent_arrays(), current_price))
+    return results
+
 # --- Objective Function ---
-def evaluate_parameters(params, num_runs=1):
-    all_price_histories = []
-    for _ in range(num_runs):
-        global supply, agents
-        supply = tf.Variable(INITIAL_TOKEN_SUPPLY, dtype=tf.float32)
-        agents = [Agent(i) for i in range(NUM_AGENTS)] # Create agents for each run
+def evaluate_objectives(params, num_runs=1, streams=None, warm_states=None):
+    """Average RunMetrics over runs; returns a dict keyed like OBJECTIVE_NAMES.
+
+    `streams` supplies one RandomStream per run for common random numbers and
+    `warm_states` one SimulationState per run to start from instead of step 0;
+    metrics then cover only the steps after the warm-up.
+    """
+    curve = bind_curve(params)  # Resolve the curve type once for all runs
+    all_metrics = []
+    for run in range(num_runs):
+        if warm_states is not None:
+            start_step = warm_states[run].restore()
+        else:
+            reset_simulation() # Create agents for each run
+            start_step = 0
+        stream = streams[run] if streams is not None else None
+        metrics = RunMetrics(curve, float(supply.numpy()))
+        current_price = run_steps(curve, start_step, SIMULATION_STEPS - start_step, metrics, stream)
+        all_metrics.append(metrics.finalize(*agent_arrays(), current_price))
+
+    return {key: float(np.mean([m[key] for m in all_metrics])) for key in all_metrics[0]}
+
+def evaluate_parameters(params, num_runs=1, streams=None, warm_states=None):
+    # Average standard deviation of the price
+    return evaluate_objectives(params, num_runs, streams, warm_states)['volatility'] # We want to minimize price volatility
+
+# --- Stress Scenarios ---
+# Scenario orders are expressed as fractions of the supply at the start of the
+# step (positive buys, negative sells), so the same script applies to any curve.
+class Scenario:
+    """Base class for scripted shocks applied to batched stress paths.
+
+    `liquidity` scales the baseline order flow; `inject` returns extra orders
+    executed before and after the baseline flow of each step, each shaped
+    (n_paths, n_steps, k). Scenarios compose with `+`.
+    """
+
+    def liquidity(self, rng, n_paths, n_steps):
+        return np.ones((n_paths, n_steps))
+
+    def inject(self, rng, flow):
+        empty = np.zeros(flow.shape + (0,))
+        return empty, empty
+
+    def __add__(self, other):
+        return CompositeScenario([self, other])
+
+class CompositeScenario(Scenario):
+    def __init__(self, scenarios):
+        self.scenarios = []
+        for scenario in scenarios:
+            self.scenarios.extend(scenario.scenarios if isinstance(scenario, CompositeScenario) else [scenario])
+
+    def liquidity(self, rng, n_paths, n_steps):
+        scale = np.ones((n_paths, n_steps))
+        for scenario in self.scenarios:
+            scale *= scenario.liquidity(rng, n_paths, n_steps)
+        return scale
+
+    def inject(self, rng, flow):
+        if not self.scenarios:
+            return Scenario.inject(self, rng, flow)
+        pre, post = zip(*(scenario.inject(rng, flow) for scenario in self.scenarios))
+        return np.concatenate(pre, axis=2), np.concatenate(post, axis=2)
+
+def _event_starts(rng, n_paths, n_steps, start, duration):
+    if start is not None:
+        return np.full(n_paths, int(start))
+    return rng.integers(0, max(n_steps - duration, 1), size=n_paths)
+
+def _event_window(rng, n_paths, n_steps, start, duration):
+    starts = _event_starts(rng, n_paths, n_steps, start, duration)
+    steps = np.arange(n_steps)
+    return (steps >= starts[:, None]) & (steps < starts[:, None] + duration)
+
+class BankRun(Scenario):
+    """Coordinated sell-off of `fraction` of supply spread over `duration` steps."""
+
+    def __init__(self, fraction=0.5, duration=20, start=None):
+        self.fraction = fraction
+        self.duration = duration
+        self.start = start
+
+    def inject(self, rng, flow):
+        n_paths, n_steps = flow.shape
+        per_step = 1 - (1 - self.fraction) ** (1 / self.duration)
+        window = _event_window(rng, n_paths, n_steps, self.start, self.duration)
+        return -per_step * window[..., None], np.zeros(flow.shape + (0,))
+
+class WhaleTrade(Scenario):
+    """A single whale entry (positive `size`) or exit (negative `size`), as a fraction of supply."""
+
+    def __init__(self, size=0.2, step=None):
+        self.size = size
+        self.step = step
+
+    def inject(self, rng, flow):
+        n_paths, n_steps = flow.shape
+        window = _event_window(rng, n_paths, n_steps, self.step, 1)
+        return self.size * window[..., None], np.zeros(flow.shape + (0,))
+
+class SandwichBots(Scenario):
+    """MEV-style bots that front-run net buy flow and unwind right after it."""
+
+    def __init__(self, size=0.01, probability=0.5):
+        self.size = size
+        self.probability = probability
+
+    def inject(self, rng, flow):
+        attack = (flow > 0) & (rng.random(flow.shape) < self.probability)
+        orders = self.size * attack
+        return orders[..., None], -orders[..., None]
+
+class LiquidityDrought(Scenario):
+    """Baseline order flow shrinks to `scale` of its usual size for `duration` steps."""
 
-        price_history = []
-        for step in range(SIMULATION_STEPS):
-            _, _, _, current_price = simulation_step(step, params)
-            price_history.append(current_price.numpy())
-        all_price_histories.append(price_history)
+    def __init__(self, scale=0.1, duration=50, start=None):
+        self.scale = scale
+        self.duration = duration
+        self.start = start
 
-    # Calculate the average standard deviation of the price
-    std_devs = [np.std(ph) for ph in all_price_histories]
-    return np.mean(std_devs) # We want to minimize price volatility
+    def liquidity(self, rng, n_paths, n_steps):
+        window = _event_window(rng, n_paths, n_steps, self.start, self.duration)
+        return np.where(window, self.scale, 1.0)
+
+STRESS_SCENARIOS = {
+    'bank_run': BankRun(),
+    'whale_dump': WhaleTrade(0.2) + WhaleTrade(-0.3),
+    'sandwich_bots': SandwichBots(),
+    'liquidity_drought': LiquidityDrought(),
+    'combined': LiquidityDrought() + SandwichBots() + BankRun(fraction=0.3),
+}
+
+def baseline_flow(rng, curve, n_paths, n_steps, initial_supply=None, num_agents=None):
+    """Net agent order flow per step as a fraction of supply, from the agent trade rules.
+
+    Replays `Agent.trade` for `num_agents` agents on every path at once: trend
+    trades off the shared price memory, the trade delay, the buy-with-capital
+    fallback and trade sizes proportional to holdings. Orders net per step and
+    fill at the quoted price. The flow is computed on the unshocked path, so
+    agents do not react to scenario shocks. `initial_supply` and `num_agents`
+    default to the module constants at call time.
+    """
+    initial_supply = INITIAL_TOKEN_SUPPLY if initial_supply is None else initial_supply
+    num_agents = NUM_AGENTS if num_agents is None else num_agents
+    capital = np.full((n_paths, num_agents), float(INITIAL_AGENT_CAPITAL))
+    tokens = np.zeros((n_paths, num_agents))
+    last_trade = np.full((n_paths, num_agents), -AGENT_TREND_DELAY)
+    memory = np.zeros((n_paths, AGENT_MEMORY_SIZE))
+    supply = np.full(n_paths, float(initial_supply))
+    flow = np.empty((n_paths, n_steps))
+
+    for step in range(n_steps):
+        price = curve.price(supply)
+        memory = np.concatenate([memory[:, 1:], price[:, None]], axis=1)
+        average = memory[:, :-1].mean(axis=1)
+        # A zero average (memory still filling) reads as an infinite rise, as in Agent.trade
+        price_diff = np.divide(memory[:, -1] - average, average, out=np.full(n_paths, np.inf), where=average > 0)
+        rising = (price_diff > AGENT_TREND_THRESHOLD)[:, None]
+        falling = (price_diff < -AGENT_TREND_THRESHOLD)[:, None]
+
+        active = (rng.random((n_paths, num_agents)) < AGENT_TRADE_FREQUENCY) & (step > last_trade + AGENT_TREND_DELAY)
+        size = rng.uniform(AGENT_TRADE_SIZE_RANGE[0], AGENT_TRADE_SIZE_RANGE[1], (n_paths, num_agents))
+        sell = active & ~rising & (tokens > 0) & (falling | (capital <= 0))
+        buy = active & ~sell & (capital > 0)
+        last_trade = np.where(buy | sell, step, last_trade)
+
+        bought = np.where(buy, capital * size / (price[:, None] * (1 + TRADING_FEE)), 0.0)
+        sold = np.where(sell, tokens * size, 0.0)
+        capital += (sold * (1 - TRADING_FEE) - bought * (1 + TRADING_FEE)) * price[:, None]
+        tokens += bought - sold
+        net = (bought - sold).sum(axis=1)
+        flow[:, step] = net / supply
+        supply += net
+    return flow
+
+def run_stress_paths(params, scenario, n_paths=1000, n_steps=None, seed=0, initial_supply=None, min_supply=1.0):
+    """Run `n_paths` stress paths for one curve in lockstep; returns per-path metric arrays.
+
+    `n_steps` and `initial_supply` default to SIMULATION_STEPS and INITIAL_TOKEN_SUPPLY at call time.
+    """
+    n_steps = SIMULATION_STEPS if n_steps is None else n_steps
+    initial_supply = INITIAL_TOKEN_SUPPLY if initial_supply is None else initial_supply
+    rng = np.random.default_rng(seed)
+    curve = bind_curve(params)
+
+    flow = baseline_flow(rng, curve, n_paths, n_steps, initial_supply) * scenario.liquidity(rng, n_paths, n_steps)
+    pre, post = scenario.inject(rng, flow)
+    orders = np.concatenate([pre, flow[..., None], post], axis=2)
+
+    supply = np.full(n_paths, float(initial_supply))
+    reserve = np.full(n_paths, float(curve.cost(0.0, initial_supply)))
+    price_mean = np.zeros(n_paths)
+    price_m2 = np.zeros(n_paths)
+    peak_price = np.zeros(n_paths)
+    max_drawdown = np.zeros(n_paths)
+    min_reserve_ratio = np.full(n_paths, np.inf)
+    weighted_slippage = np.zeros(n_paths)
+    volume = np.zeros(n_paths)
+
+    for step in range(n_steps):
+        price = curve.price(supply)
+        delta = price - price_mean
+        price_mean += delta / (step + 1)
+        price_m2 += delta * (price - price_mean)
+        peak_price = np.maximum(peak_price, price)
+        max_drawdown = np.maximum(max_drawdown, 1 - price / peak_price)
+
+        step_supply = supply.copy()
+        for slot in range(orders.shape[2]):
+            amount = np.maximum(orders[:, step, slot] * step_supply, min_supply - supply)
+            cost = curve.cost(supply, amount)
+            reserve += np.where(amount > 0, cost * (1 + TRADING_FEE), cost * (1 - TRADING_FEE))
+            traded = np.abs(amount)
+            execution_price = np.divide(cost, amount, out=price.copy(), where=traded > 0)
+            weighted_slippage += traded * np.abs(execution_price - price) / price
+            volume += traded
+            supply += amount
+
+        min_reserve_ratio = np.minimum(min_reserve_ratio, reserve / (curve.price(supply) * supply))
+
+    return {
+        'volatility': np.sqrt(price_m2 / n_steps),
+        'max_drawdown': max_drawdown,
+        'min_reserve_ratio': min_reserve_ratio,
+        'slippage': np.divide(weighted_slippage, volume, out=np.zeros(n_paths), where=volume > 0),
+        'final_price': curve.price(supply),
+        'final_supply': supply,
+    }
+
+def evaluate_stress(params, scenarios=STRESS_SCENARIOS, n_paths=1000, seed=0, tail=0.95):
+    """Mean and tail quantile of each stress metric, per scenario."""
+    summary = {}
+    for offset, (name, scenario) in enumerate(scenarios.items()):
+        results = run_stress_paths(params, scenario, n_paths=n_paths, seed=seed + offset)
+        summary[name] = {}
+        for metric, values in results.items():
+            # Low reserve ratios are the bad tail
+            q = 1 - tail if metric == 'min_reserve_ratio' else tail
+            summary[name][metric] = {'mean': float(np.mean(values)), 'tail': float(np.quantile(values, q))}
+    return summary
+
+# Stress metric behind each stress_* objective
+STRESS_OBJECTIVES = {
+    'stress_volatility': 'volatility',
+    'stress_drawdown': 'max_drawdown',
+    'stress_reserve_ratio': 'min_reserve_ratio',
+    'stress_slippage': 'slippage',
+}
+
+def stress_objectives(params, scenarios=STRESS_SCENARIOS, n_paths=None, seed=0, tail=0.95):
+    """Worst tail value of each stress metric across `scenarios`, keyed by stress_* objective name."""
+    n_paths = OPTIMIZER_STRESS_PATHS if n_paths is None else n_paths
+    summary = evaluate_stress(params, scenarios, n_paths, seed, tail)
+    worst = {}
+    for name, metric in STRESS_OBJECTIVES.items():
+        tails = [results[metric]['tail'] for results in summary.values()]
+        worst[name] = min(tails) if OBJECTIVE_SENSE[name] < 0 else max(tails)
+    return worst
 
 # --- Optimization Function ---
-def optimize_bonding_curve(curve_type, n_trials=10):
+def sample_curve_params(curve_type):
+    return get_curve(curve_type).sample()
+
+def prepare_trial_inputs(curve_type, num_runs=1, crn_seed=None, warm_start_steps=0):
+    """Shared random streams and burned-in states for a set of optimizer trials.
+
+    With `crn_seed` set, every trial replays the same pre-drawn streams (one per run).
+    With `warm_start_steps` > 0, each run is burned in once on the curve's default
+    parameters and every trial continues from that state.
+    """
+    streams = None
+    if crn_seed is not None:
+        streams = [RandomStream(SIMULATION_STEPS, NUM_AGENTS, seed=crn_seed + run) for run in range(num_runs)]
+
+    warm_states = None
+    if warm_start_steps > 0:
+        reference_curve = get_curve(curve_type).bind({})
+        warm_states = []
+        for run in range(num_runs):
+            reset_simulation()
+            run_steps(reference_curve, 0, warm_start_steps, stream=streams[run] if streams is not None else None)
+            warm_states.append(SimulationState.capture(warm_start_steps))
+    return streams, warm_states
+
+def evaluate_trial(params, objectives, num_runs=1, streams=None, warm_states=None, stress_scenarios=STRESS_SCENARIOS):
+    """evaluate_objectives, plus stress_objectives when any of `objectives` is a stress objective."""
+    metrics = evaluate_objectives(params, num_runs, streams, warm_states)
+    if any(name in STRESS_OBJECTIVES for name in objectives):
+        metrics.update(stress_objectives(params, stress_scenarios))
+    return metrics
+
+def optimize_bonding_curve(curve_type, n_trials=10, num_runs=1, crn_seed=None, warm_start_steps=0,
+                           objective='volatility', stress_scenarios=STRESS_SCENARIOS):
+    """Random search minimising one objective (price volatility by default).
+
+    Pass a stress_* `objective` to rank trials by their worst tail under `stress_scenarios`.
+    """
+    streams, warm_states = prepare_trial_inputs(curve_type, num_runs, crn_seed, warm_start_steps)
     best_params = None
-    best_objective_value = float('inf') # Lower standard deviation is better
+    best_objective_value = float('inf')
 
-    print(f"Starting optimization for {curve_type} bonding curve...")
+    print(f"Starting optimization for {curve_type} bonding curve ({objective})...")
 
     for i in range(n_trials):
         print(f"Optimization Trial {i+1}/{n_trials}")
-        if curve_type == 'linear':
-            params = {
-                'type': 'linear',
-                'm': random.uniform(0.01, 0.2),
-                'b': random.uniform(0.5, 2.0)
-            }
-        elif curve_type == 'exponential':
-            params = {
-                'type': 'exponential',
-                'a': random.uniform(0.01, 0.2),
-                'k': random.uniform(0.005, 0.02)
-            }
-        elif curve_type == 'sigmoid':
-            params = {
-                'type': 'sigmoid',
-                'k': random.uniform(0.01, 0.05),
-                's0': random.uniform(50, 150),
-                'k_max': random.uniform(5, 15)
-            }
-        elif curve_type == 'multi-segment':
-            params = {
-                'type': 'multi-segment',
-                'breakpoint': random.uniform(100, 300),
-                'm': random.uniform(0.01, 0.1),
-                'a': random.uniform(0.01, 0.2),
-                'k': random.uniform(0.01, 0.03)
-            }
-        else:
-            raise ValueError("Invalid bonding curve type for optimization")
+        params = sample_curve_params(curve_type)
 
-        objective_value = evaluate_parameters(params, num_runs=1) # Consider increasing num_runs for more robust evaluation
+        # Consider increasing num_runs for more robust evaluation
+        metrics = evaluate_trial(params, [objective], num_runs, streams, warm_states, stress_scenarios)
+        objective_value = OBJECTIVE_SENSE[objective] * metrics[objective]
 
-        print(f"  Trial {i+1} - Parameters: {params}, Price Std Dev: {objective_value:.4f}")
+        print(f"  Trial {i+1} - Parameters: {params}, {objective}: {metrics[objective]:.4f}")
 
         if objective_value < best_objective_value:
             best_objective_value = objective_value
             best_params = params
-            print(f"  New best parameters found with Std Dev: {best_objective_value:.4f}")
+            print(f"  New best parameters found with {objective}: {metrics[objective]:.4f}")
 
     print(f"Optimization for {curve_type} complete.")
     print(f"Best Parameters: {best_params}")
     return best_params
 
+def optimize_bonding_curve_pareto(curve_type, n_trials=10, objectives=OBJECTIVE_NAMES, num_runs=1,
+                                  crn_seed=None, warm_start_steps=0, stress_scenarios=STRESS_SCENARIOS):
+    """Random search over a vector objective; returns the Pareto-optimal (params, metrics) pairs.
+
+    `objectives` may include stress_* names to weigh tail behaviour under `stress_scenarios`.
+    """
+    streams, warm_states = prepare_trial_inputs(curve_type, num_runs, crn_seed, warm_start_steps)
+    trials = []
+    print(f"Starting multi-objective optimization for {curve_type} bonding curve ({', '.join(objectives)})...")
+
+    for i in range(n_trials):
+        params = sample_curve_params(curve_type)
+        metrics = evaluate_trial(params, objectives, num_runs, streams, warm_states, stress_scenarios)
+        trials.append((params, metrics))
+        summary = ", ".join(f"{name}: {metrics[name]:.4f}" for name in objectives)
+        print(f"  Trial {i+1}/{n_trials} - {summary}")
+
+    front = pareto_front([objective_vector(metrics, objectives) for _, metrics in trials])
+    print(f"Pareto front for {curve_type}: {len(front)} of {n_trials} trials are non-dominated.")
+    return [trials[i] for i in front]
+
 # --- Main Execution ---
 if __name__ == "__main__":
     # Choose the bonding curve type to optimize
     OPTIMIZE_CURVE_TYPE = 'sigmoid' # Example: Optimize the sigmoid curve
 
-    optimal_params = optimize_bonding_curve(OPTIMIZE_CURVE_TYPE, n_trials=20)
+    optimal_params = optimize_bonding_curve(
+        OPTIMIZE_CURVE_TYPE, n_trials=20, crn_seed=OPTIMIZER_CRN_SEED, warm_start_steps=OPTIMIZER_WARM_START_STEPS
+    )
 
     # --- Simulate with Optimal Parameters ---
     print(f"\nSimulating with optimal parameters for {OPTIMIZE_CURVE_TYPE}: {optimal_params}")
 
     BONDING_CURVE_TYPE = OPTIMIZE_CURVE_TYPE # Set the global variable for plotting
-    supply = tf.Variable(INITIAL_TOKEN_SUPPLY, dtype=tf.float32)
-    agents = [Agent(i) for i in range(NUM_AGENTS)]
-    supply_history = []
-    price_history = []
-    agent_capital_history = []
-    agent_token_history = []
-    all_agent_capital_history = []
-    all_agent_token_history = []
+    reset_simulation()
+    supply_history = np.zeros(SIMULATION_STEPS, dtype=np.float32)
+    price_history = np.zeros(SIMULATION_STEPS, dtype=np.float32)
+    timepoints = np.linspace(0, SIMULATION_STEPS - 1, HISTOGRAM_TIMEPOINTS, dtype=int)
+    recorder = SnapshotRecorder(SIMULATION_STEPS, NUM_AGENTS, timepoints, SNAPSHOT_STRIDE, path=SNAPSHOT_DIR)
+    run_metrics = RunMetrics(optimal_params)
     start_time = time.time()
 
     for step in range(SIMULATION_STEPS):
-        current_supply, agent_capitals, agent_tokens, current_price = simulation_step(step, optimal_params)
-        supply_history.append(current_supply.numpy())
-        price_history.append(current_price.numpy())
-        agent_capital_history.append([c.numpy() for c in agent_capitals])
-        agent_token_history.append([t.numpy() for t in agent_tokens])
-        all_agent_capital_history.append(np.array([c.numpy() for c in agent_capitals]))
-        all_agent_token_history.append(np.array([t.numpy() for t in agent_tokens]))
+        current_supply, agent_capitals, agent_tokens, current_price = simulation_step(step, optimal_params, run_metrics)
+        supply_history[step] = current_supply.numpy()
+        price_history[step] = current_price.numpy()
+        # One device transfer per quantity instead of one per agent
+        recorder.record(step, tf.stack(agent_capitals).numpy(), tf.stack(agent_tokens).numpy())
 
         if (step + 1) % 500 == 0:
             current_time = time.time()
             elapsed_time = current_time - start_time
             print(
-                f"Step {step + 1}/{SIMULATION_STEPS} | Elapsed: {elapsed_time:.2f}s | Supply: {current_supply.numpy():.2f} | Price: {current_price.numpy():.2f} | Avg. Capital: {tf.reduce_mean([c.numpy() for c in agent_capitals]):.2f} | Avg. Tokens: {tf.reduce_mean([t.numpy() for t in agent_tokens]):.2f}"
+                f"Step {step + 1}/{SIMULATION_STEPS} | Elapsed: {elapsed_time:.2f}s | Supply: {supply_history[step]:.2f} | Price: {price_history[step]:.2f} | Avg. Capital: {recorder.capital_mean[step]:.2f} | Avg. Tokens: {recorder.token_mean[step]:.2f}"
             )
 
+    recorder.flush()
     print("Simulation with optimal parameters complete.")
     end_time = time.time()
     total_time = end_time - start_time
     print(f"Total simulation time: {total_time:.2f} seconds")
 
-    # --- Analysis and Visualization ---
-    supply_history = np.array(supply_history)
-    price_history = np.array(price_history)
-    agent_capital_history = np.array(agent_capital_history)
-    agent_token_history = np.array(agent_token_history)
-    all_agent_capital_history = np.array(all_agent_capital_history)
-    all_agent_token_history = np.array(all_agent_token_history)
-
+    final_metrics = run_metrics.finalize(*agent_arrays(), current_price)
+    print("Run metrics: " + ", ".join(f"{name}={value:.4f}" for name, value in final_metrics.items()))
 
+    # --- Analysis and Visualization ---
     # Plot token supply over time
     plt.figure(figsize=(12, 6))
     plt.plot(supply_history)
@@ -293,7 +992,8 @@ if __name__ == "__main__":
 
     # Plot average agent capital over time
     plt.figure(figsize=(12, 6))
-    plt.plot(np.mean(agent_capital_history, axis=1))
+    plt.plot(recorder.capital_mean)
+    plt.fill_between(np.arange(SIMULATION_STEPS), recorder.capital_quantiles[:, 0], recorder.capital_quantiles[:, -1], alpha=0.2)
     plt.title(f"Average Agent Capital Over Time (Optimal {OPTIMIZE_CURVE_TYPE})")
     plt.xlabel("Simulation Step")
     plt.ylabel("Average Agent Capital")
@@ -301,25 +1001,24 @@ if __name__ == "__main__":
 
     # Plot average agent token over time
     plt.figure(figsize=(12, 6))
-    plt.plot(np.mean(agent_token_history, axis=1))
+    plt.plot(recorder.token_mean)
+    plt.fill_between(np.arange(SIMULATION_STEPS), recorder.token_quantiles[:, 0], recorder.token_quantiles[:, -1], alpha=0.2)
     plt.title(f"Average Agent Tokens Over Time (Optimal {OPTIMIZE_CURVE_TYPE})")
     plt.xlabel("Simulation Step")
     plt.ylabel("Average Agent Tokens")
     plt.savefig("optimal_agent_tokens.png")
 
     # Plot wealth distribution over time
-    num_timepoints_to_plot = 5
-    timepoints = np.linspace(0, len(all_agent_capital_history) - 1, num_timepoints_to_plot, dtype=int)
-
-    fig, axs = plt.subplots(2, num_timepoints_to_plot, figsize=(18, 10))
+    fig, axs = plt.subplots(2, HISTOGRAM_TIMEPOINTS, figsize=(18, 10))
 
     for i, timepoint in enumerate(timepoints):
-        axs[0, i].hist(all_agent_capital_history[timepoint], bins=30, color='skyblue', edgecolor='black')
+        capital_snapshot, token_snapshot = recorder.snapshot(timepoint)
+        axs[0, i].hist(capital_snapshot, bins=30, color='skyblue', edgecolor='black')
         axs[0, i].set_title(f'Capital Dist. at Step {timepoint}')
         axs[0, i].set_xlabel('Capital')
         axs[0, i].set_ylabel('Frequency')
 
-        axs[1, i].hist(all_agent_token_history[timepoint], bins=30, color='lightgreen', edgecolor='black')
+        axs[1, i].hist(token_snapshot, bins=30, color='lightgreen', edgecolor='black')
         axs[1, i].set_title(f'Token Dist. at Step {timepoint}')
         axs[1, i].set_xlabel('Tokens')
         axs[1, i].set_ylabel('Frequency')
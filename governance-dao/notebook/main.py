@@ -34,68 +34,593 @@ import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 import random
+import heapq
+from collections import Counter
 from typing import List, Dict
 import os
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # PyArrow is optional; holdings snapshots then come from .npy files
+    pq = None
 
 # Configuration
 NUM_VOTERS = 100
 SIMULATION_STEPS = 50
 TREASURY_INITIAL = 10000
 PROPOSAL_SUBMISSION_RATE = 0.1
-MIN_VOTING_THRESHOLD = 0.5
+MIN_VOTING_THRESHOLD = 0.5  # Share of cast voting power that must be in favour (0.5 = simple majority)
 VOTER_PARTICIPATION_RATE = 0.8
 WHALE_THRESHOLD_MULTIPLIER = 1.2  # Token holdings multiplier for "whales"
+DELEGATION_RATE = 0.3
+VOTING_PERIOD = 5  # Steps a proposal stays open for votes
+TIMELOCK_PERIOD = 2  # Steps between passing and execution
+QUORUM = 0.1  # Share of eligible voting power that must vote for a proposal to pass
+VOTE_ARRIVAL_RATE = 0.5  # Per-step chance that a participating voter who has not voted yet votes
+EARLY_CLOSE = True  # Close voting as soon as the outcome can no longer change
+TALLY_CHUNK_SIZE = 65536  # Voters per block when tallying many proposals at once
+TOP_HOLDERS = 10  # Holders counted in the top-share concentration metric
+
+# Treasury
+TREASURY_FEE_RATE = 0.01  # Fee income as a share of each allocation
+GRANT_STREAM_SHARE = 0.5  # Share of passed allocations paid as vesting grants instead of lump sums
+GRANT_VESTING_STEPS = 10
+GRANT_CLIFF_STEPS = 2
+PROJECTION_STEPS = 100  # Horizon of treasury cash-flow projections
+PROJECTION_PATHS = 1000  # Monte Carlo paths per projection
+TREASURY_SCENARIO_STEPS = 500  # Long run in main() so enough allocations pass to exercise grants and streams
+
+# Holdings sources, tried in order
+HOLDINGS_SNAPSHOT_PATH = os.path.join('..', 'affiliate', 'holdings.npy')
+AFFILIATE_OUTPUT_PATH = os.path.join('..', 'affiliate', 'output.txt')
+HOLDINGS_COLUMN = 'holdings'  # Column read from Parquet snapshots
+
+# Proposal statuses
+PROPOSAL_STATUSES = ('open', 'passed', 'failed', 'executed')
 
 # Voting mechanisms
 VOTING_MECHANISMS = ['simple', 'quadratic', 'delegation']
+COMPARISON_MECHANISMS = VOTING_MECHANISMS + ['conviction', 'holographic']
+
+# Mechanism comparison
+COMPARISON_SEED = 0
+COMPARISON_SEEDS = 20
+COMPARISON_PROPOSALS = 200  # Proposals voted on per seed
+COMPARISON_BOOTSTRAP = 2000  # Resamples for paired-difference confidence intervals
+CONVICTION_DECAY = 0.7  # Per-step retention of conviction; staked votes approach full weight over the window
+HOLOGRAPHIC_BOOST_RATIO = 2.0  # Predictor stake for/against needed to boost a proposal to relative majority
+
+class DelegationGraph:
+    """Transitive (liquid) delegation over voters.
+
+    `delegate[i]` is the voter i delegates to, or -1. Every chain ends at a root
+    that votes with the summed weight of its whole subtree. Cycles are broken by
+    cutting the lowest-id member's outgoing edge, which makes it the root; cut
+    voters are logged in `cut_voters`. The delegate array is modified in place.
+
+    Roots and subtree weights are resolved by pointer jumping (O(N log depth)
+    vectorized). Reverse edges are kept as CSR arrays from the last build plus a
+    small overlay of edges added since, so `set_delegate` only touches the
+    moved subtree and the ancestors on the old and new chains.
+    """
+
+    def __init__(self, delegate: np.ndarray, weights: np.ndarray):
+        self.delegate = delegate
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.cut_voters: List[int] = []
+        self.build()
+
+    def _jump_steps(self) -> int:
+        return max(1, int(np.ceil(np.log2(max(len(self.delegate), 2)))) + 1)
+
+    def _break_cycles(self):
+        # After 2^K >= N jumps every voter sits on the cycle its chain ends in, and the
+        # images cover each cycle entirely; running minima give each cycle's lowest id
+        n = len(self.delegate)
+        ids = np.arange(n)
+        successor = np.where(self.delegate >= 0, self.delegate, ids)
+        lowest = ids.copy()
+        for _ in range(self._jump_steps()):
+            lowest = np.minimum(lowest, lowest[successor])
+            successor = successor[successor]
+        on_cycle = np.unique(successor)
+        cut = on_cycle[(lowest[on_cycle] == on_cycle) & (self.delegate[on_cycle] >= 0)]
+        self.delegate[cut] = -1
+        self.cut_voters.extend(cut.tolist())
+
+    def build(self):
+        self._break_cycles()
+        n = len(self.delegate)
+        ids = np.arange(n)
+        delegated = self.delegate >= 0
+        root = np.where(delegated, self.delegate, ids)
+        depth = delegated.astype(np.int64)
+        for _ in range(self._jump_steps()):
+            depth = depth + depth[root]
+            root = root[root]
+        self.root = root
+
+        # Subtree weights, accumulated one depth level at a time from the leaves up
+        self.subtree_weight = self.weights.copy()
+        for level in range(int(depth.max(initial=0)), 0, -1):
+            members = np.flatnonzero(depth == level)
+            self.subtree_weight += np.bincount(self.delegate[members], weights=self.subtree_weight[members], minlength=n)
+
+        # Reverse edges as CSR: children of v are indices[indptr[v]:indptr[v + 1]]
+        children = np.flatnonzero(delegated)
+        order = np.argsort(self.delegate[children], kind='stable')
+        self.indices = children[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(self.delegate[children], minlength=n))])
+        self._built_delegate = self.delegate.copy()
+        self._added_children: Dict[int, set] = {}
+
+    @property
+    def effective_power(self) -> np.ndarray:
+        """Aggregated weight at each root, zero for voters who delegate."""
+        return np.where(self.delegate < 0, self.subtree_weight, 0.0)
+
+    def children(self, voter: int) -> List[int]:
+        built = self.indices[self.indptr[voter]:self.indptr[voter + 1]]
+        candidates = built.tolist() + list(self._added_children.get(voter, ()))
+        return [c for c in candidates if self.delegate[c] == voter]
+
+    def _subtree(self, voter: int) -> List[int]:
+        members, frontier = [voter], [voter]
+        while frontier:
+            frontier = [c for v in frontier for c in self.children(v)]
+            members.extend(frontier)
+        return members
+
+    def _add_to_chain(self, start: int, amount: float):
+        node = start
+        while node >= 0:
+            self.subtree_weight[node] += amount
+            node = self.delegate[node]
+
+    def _detach(self, voter: int):
+        old = self.delegate[voter]
+        if old < 0:
+            return
+        self._add_to_chain(old, -self.subtree_weight[voter])
+        self.delegate[voter] = -1
+        self.root[self._subtree(voter)] = voter
+
+    def _attach(self, voter: int, target: int):
+        self.delegate[voter] = target
+        if self._built_delegate[voter] != target:
+            self._added_children.setdefault(target, set()).add(voter)
+        self._add_to_chain(target, self.subtree_weight[voter])
+        self.root[self._subtree(voter)] = self.root[target]
+
+    def set_delegate(self, voter: int, target: int):
+        """Re-point one voter (target -1 revokes); a resulting cycle is cut at its lowest id."""
+        self._detach(voter)
+        if target < 0:
+            return
+        if self.root[target] == voter:
+            # target is in voter's subtree, so the new edge closes a cycle
+            cycle, node = [voter], target
+            while node != voter:
+                cycle.append(node)
+                node = self.delegate[node]
+            lowest = min(cycle)
+            self.cut_voters.append(lowest)
+            if lowest == voter:
+                return
+            self._detach(lowest)
+        self._attach(voter, target)
+
+class VoterPopulation:
+    """Voter state as parallel arrays indexed by voter id.
+
+    `delegated_to` holds the delegate's id, or -1 for voters who vote themselves.
+    """
+
+    def __init__(self, token_holdings, is_whale, participates, delegated_to=None):
+        self.token_holdings = np.asarray(token_holdings, dtype=np.float64)
+        self.is_whale = np.asarray(is_whale, dtype=bool)
+        self.participates = np.asarray(participates, dtype=bool)
+        n = len(self.token_holdings)
+        self.delegated_to = np.full(n, -1, dtype=np.int64) if delegated_to is None else np.asarray(delegated_to, dtype=np.int64)
+        self.delegation = DelegationGraph(self.delegated_to, self.token_holdings)
+
+    @classmethod
+    def from_holdings(cls, token_holdings, whale_threshold, rng):
+        token_holdings = np.asarray(token_holdings, dtype=np.float64)
+        participates = rng.random(len(token_holdings)) < VOTER_PARTICIPATION_RATE
+        return cls(token_holdings, token_holdings > whale_threshold, participates)
+
+    def __len__(self):
+        return len(self.token_holdings)
+
+    def assign_random_delegates(self, rate, rng):
+        # Each delegator picks a uniformly random other voter: offset by 1..n-1 so nobody picks themselves
+        n = len(self)
+        delegates = (np.arange(n) + rng.integers(1, n, size=n)) % n if n > 1 else np.zeros(n, dtype=np.int64)
+        self.delegated_to = np.where(rng.random(n) < rate, delegates, -1)
+        self.delegation = DelegationGraph(self.delegated_to, self.token_holdings)
+
+    def set_delegate(self, voter_id: int, delegate_id: int):
+        self.delegation.set_delegate(voter_id, delegate_id)
+
+    @property
+    def support_chance(self) -> np.ndarray:
+        return 0.5 + 0.2 * self.is_whale
+
+    def voting_power(self, voting_mechanism: str, participating_only: bool = True) -> np.ndarray:
+        """Unsigned vote weight per voter, zero for non-participants unless `participating_only` is False."""
+        if voting_mechanism == 'simple':
+            power = self.token_holdings
+        elif voting_mechanism == 'quadratic':
+            power = np.sqrt(self.token_holdings)
+        elif voting_mechanism == 'delegation':
+            # Liquid democracy: each chain's root votes with the holdings of everyone below it
+            power = self.delegation.effective_power
+        else:
+            return np.zeros(len(self))
+        return np.where(self.participates, power, 0.0) if participating_only else power
+
+    def voter_power(self, voter_id: int, voting_mechanism: str) -> float:
+        """`voting_power(voting_mechanism)[voter_id]` without building the population array."""
+        if not self.participates[voter_id]:
+            return 0.0
+        if voting_mechanism == 'simple':
+            return float(self.token_holdings[voter_id])
+        if voting_mechanism == 'quadratic':
+            return float(np.sqrt(self.token_holdings[voter_id]))
+        if voting_mechanism == 'delegation':
+            delegation = self.delegation
+            return float(delegation.subtree_weight[voter_id]) if delegation.delegate[voter_id] < 0 else 0.0
+        return 0.0
+
+class HoldingsSnapshot:
+    """Token holdings to seed a voter population, loaded lazily on first access.
+
+    Sources: a .npy file (memory-mapped), a Parquet file (`HOLDINGS_COLUMN`), an
+    affiliate engine's `export_state()` dict, or the legacy output.txt log.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._holdings = None
+
+    @classmethod
+    def from_array(cls, holdings):
+        return cls(lambda: np.asarray(holdings, dtype=np.float64))
+
+    @classmethod
+    def from_export(cls, state: Dict):
+        """In-memory handoff from AffiliateProtocolWrapper.export_state()."""
+        return cls(lambda: np.fromiter((float(b) for b in state['affiliate_balances'].values()), dtype=np.float64))
+
+    @classmethod
+    def from_file(cls, path: str):
+        if path.endswith('.npy'):
+            return cls(lambda: np.load(path, mmap_mode='r'))
+        if path.endswith('.parquet'):
+            if pq is None:
+                raise ImportError("pyarrow is required to read Parquet holdings snapshots")
+            return cls(lambda: pq.read_table(path, columns=[HOLDINGS_COLUMN]).column(0).to_numpy())
+        return cls(lambda: cls._parse_log(path))
+
+    @staticmethod
+    def _parse_log(path: str) -> np.ndarray:
+        # Streams the log line by line instead of reading it whole
+        with open(path, 'r') as f:
+            return np.fromiter((float(line.split(':')[1]) for line in f if 'Final Base Currency:' in line), dtype=np.float64)
+
+    @classmethod
+    def discover(cls, paths=(HOLDINGS_SNAPSHOT_PATH, AFFILIATE_OUTPUT_PATH)):
+        """Snapshot from the first existing path, or None."""
+        for path in paths:
+            if os.path.exists(path):
+                return cls.from_file(path)
+        return None
+
+    @property
+    def holdings(self) -> np.ndarray:
+        if self._holdings is None:
+            self._holdings = self._loader()
+        return self._holdings
+
+    def __len__(self):
+        return len(self.holdings)
+
+    def save(self, path: str):
+        np.save(path, np.asarray(self.holdings, dtype=np.float64))
+
+    def sample(self, num_voters: int, rng, method: str = 'bootstrap') -> np.ndarray:
+        """Draw voter holdings: 'bootstrap' resamples with replacement, 'cycle' repeats the snapshot in order."""
+        if method == 'bootstrap':
+            return np.asarray(self.holdings[rng.integers(0, len(self), num_voters)], dtype=np.float64)
+        if method == 'cycle':
+            return np.resize(np.asarray(self.holdings, dtype=np.float64), num_voters)
+        raise ValueError(f"Unknown sampling method: {method}")
+
+class HoldingsMetrics:
+    """Inequality and concentration of a holdings (or voting power) array, cached between changes.
+
+    Keeps the values sorted with prefix sums plus the pairwise-difference sum
+    P = sum over i<j of |x_i - x_j|, from which the Gini coefficient follows in
+    O(1). `update` patches P with two O(log N) rank lookups on the sorted buffer,
+    corrected for a small overlay of changes made since the last sort. The
+    rank-based metrics read the same sorted buffer plus overlay: they bisect for
+    the threshold value of the top holders, counting and summing values above it
+    in O(log N + overlay) per probe. The buffer is re-sorted lazily, once the
+    overlay grows past `rebuild_threshold`. Bulk changes call `mark_dirty()`.
+    """
+
+    def __init__(self, holdings: np.ndarray, rebuild_threshold: int = None):
+        self.holdings = holdings
+        self.rebuild_threshold = rebuild_threshold or max(64, int(np.sqrt(len(holdings))))
+        self._dirty = True
+        self._rebuild()
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def _rebuild(self):
+        self._sorted = np.sort(self.holdings)
+        self._prefix = np.concatenate([[0.0], np.cumsum(self._sorted)])
+        n = len(self._sorted)
+        self._total = self._prefix[-1]
+        self._pairwise = float(np.dot(2 * np.arange(n) - n + 1, self._sorted))
+        self._added: List[float] = []
+        self._removed: List[float] = []
+        self._overlay = None
+        self._dirty = False
+
+    def _ensure(self):
+        if self._dirty:
+            self._rebuild()
+
+    def _parts(self):
+        """(sorted values, prefix sums, sign) for the buffer and the net overlay additions and removals."""
+        if self._overlay is None:
+            added, removed = Counter(self._added), Counter(self._removed)
+            common = added & removed  # A value added and later replaced again cancels out
+            self._overlay = [(self._sorted, self._prefix, 1)]
+            for values, sign in ((added - common, 1), (removed - common, -1)):
+                if values:
+                    ordered = np.sort(np.fromiter(values.elements(), dtype=np.float64))
+                    self._overlay.append((ordered, np.concatenate([[0.0], np.cumsum(ordered)]), sign))
+        return self._overlay
+
+    def _above(self, value: float, strict: bool = False):
+        """(count, sum) of current values >= `value` (> `value` when `strict`)."""
+        side = 'right' if strict else 'left'
+        count, total = 0, 0.0
+        for values, prefix, sign in self._parts():
+            rank = np.searchsorted(values, value, side=side)
+            count += sign * (len(values) - rank)
+            total += sign * (prefix[-1] - prefix[rank])
+        return count, total
+
+    def _largest_value(self, predicate):
+        """Largest current value v for which `predicate(*self._above(v))` holds, or None.
+
+        `predicate` must hold for every value below one that satisfies it.
+        """
+        best = None
+        values = self._sorted
+        if len(values) and predicate(*self._above(values[0])):
+            low, high = 0, len(values) - 1
+            while low < high:
+                mid = (low + high + 1) // 2
+                if predicate(*self._above(values[mid])):
+                    low = mid
+                else:
+                    high = mid - 1
+            best = values[low]
+        for added, _, sign in self._parts()[1:]:
+            if sign > 0:
+                for value in added[::-1]:
+                    if best is not None and value <= best:
+                        break
+                    if predicate(*self._above(value)):
+                        best = value
+                        break
+        return best
+
+    def _distance_sum(self, value: float) -> float:
+        """Sum of |value - x| over the current holdings."""
+        rank = np.searchsorted(self._sorted, value)
+        below, total = self._prefix[rank], self._prefix[-1]
+        n = len(self._sorted)
+        distance = value * rank - below + (total - below) - value * (n - rank)
+        if self._added:
+            distance += np.abs(value - np.asarray(self._added)).sum()
+        if self._removed:
+            distance -= np.abs(value - np.asarray(self._removed)).sum()
+        return float(distance)
+
+    def update(self, voter_id: int, new_value: float):
+        self._ensure()
+        old_value = float(self.holdings[voter_id])
+        self._pairwise -= self._distance_sum(old_value)
+        self._removed.append(old_value)
+        self.holdings[voter_id] = new_value
+        self._pairwise += self._distance_sum(new_value)
+        self._added.append(new_value)
+        self._overlay = None
+        self._total += new_value - old_value
+        if len(self._added) > self.rebuild_threshold:
+            self._dirty = True
+
+    def gini(self) -> float:
+        self._ensure()
+        n = len(self.holdings)
+        if n == 0 or self._total <= 0:
+            return 0
+        # G = sum over all ordered pairs of |x_i - x_j| / (2 n^2 mean) = P / (n * total)
+        return self._pairwise / (n * self._total)
+
+    def top_share(self, k: int = TOP_HOLDERS) -> float:
+        self._ensure()
+        total = self._total
+        if total <= 0:
+            return 0.0
+        if k >= len(self.holdings):
+            return 1.0
+        # The k-th largest value v; the top k are everything above v plus enough copies of v
+        threshold = self._largest_value(lambda count, _: count >= k)
+        count, above = self._above(threshold, strict=True)
+        return float((above + (k - count) * threshold) / total)
+
+    def nakamoto_coefficient(self) -> int:
+        """Fewest holders who together hold more than half of the total."""
+        self._ensure()
+        total = self._total
+        if total <= 0:
+            return 0
+        half = total / 2
+        # Smallest value v whose holders and everyone above them hold more than half
+        threshold = self._largest_value(lambda _, held: held > half)
+        if threshold is None or threshold <= 0:
+            # Non-positive values break the bisection's monotonicity; fall back to the sorted prefix
+            self._rebuild()
+            top_sums = total - self._prefix[::-1]  # top_sums[k]: holdings of the k largest holders
+            return int(np.searchsorted(top_sums, half, side='right'))
+        count, above = self._above(threshold, strict=True)
+        return int(count + np.floor((half - above) / threshold) + 1)
 
 class Voter:
-    def __init__(self, voter_id: int, token_holdings: float, is_whale: bool = False):
+    """View of one voter in a VoterPopulation."""
+
+    def __init__(self, population: VoterPopulation, voter_id: int):
+        self.population = population
         self.id = voter_id
-        self.token_holdings = token_holdings
-        self.is_whale = is_whale
-        self.voting_power_simple = token_holdings
-        self.voting_power_quadratic = np.sqrt(token_holdings)
-        self.participates = random.random() < VOTER_PARTICIPATION_RATE
-        self.delegated_to = None
+
+    @property
+    def token_holdings(self) -> float:
+        return float(self.population.token_holdings[self.id])
+
+    @property
+    def is_whale(self) -> bool:
+        return bool(self.population.is_whale[self.id])
+
+    @property
+    def participates(self) -> bool:
+        return bool(self.population.participates[self.id])
+
+    @property
+    def delegated_to(self):
+        delegate = self.population.delegated_to[self.id]
+        return Voter(self.population, int(delegate)) if delegate >= 0 else None
+
+    @property
+    def voting_power_simple(self) -> float:
+        return self.token_holdings
+
+    @property
+    def voting_power_quadratic(self) -> float:
+        return float(np.sqrt(self.token_holdings))
 
     def vote(self, proposal, voting_mechanism: str) -> float:
         if not self.participates:
             return 0
+        support = random.random() < float(self.population.support_chance[self.id])
+        vote_power = self.population.voter_power(self.id, voting_mechanism)
+        return vote_power if support else -vote_power
 
-        # Base support probability depends on holdings and whale status
-        support_chance = 0.5 + (0.2 if self.is_whale else 0)
-        if self.token_holdings > np.mean([v.token_holdings for v in [self]]):  # Simplified, assume context
-            support_chance += 0.1
+class TallyEngine:
+    """Vectorized tallies over a VoterPopulation.
 
-        support = random.random() < support_chance
+    A tally matches casting every voter's vote: signed power summed, whale votes on
+    parameter proposals counted 1.5 times, and total voting power as the sum of
+    unsigned power (which does not depend on the support draws).
+    """
 
-        if voting_mechanism == 'simple':
-            vote_power = self.voting_power_simple if support else -self.voting_power_simple
-        elif voting_mechanism == 'quadratic':
-            vote_power = self.voting_power_quadratic if support else -self.voting_power_quadratic
-        elif voting_mechanism == 'delegation':
-            # Use delegated voting if applicable (simplified)
-            delegate = self.delegated_to
-            if delegate:
-                vote_power = delegate.voting_power_simple if support else -delegate.voting_power_simple
-            else:
-                vote_power = self.voting_power_simple if support else -self.voting_power_simple
+    def __init__(self, population: VoterPopulation, chunk_size: int = TALLY_CHUNK_SIZE):
+        self.population = population
+        self.chunk_size = chunk_size
+
+    def draw_support(self, rng, num_proposals: int = None) -> np.ndarray:
+        chance = self.population.support_chance
+        if num_proposals is None:
+            return rng.random(len(chance)) < chance
+        return rng.random((len(chance), num_proposals)) < chance[:, None]
+
+    def tally_matrix(self, voting_mechanism: str, amplify_whales: np.ndarray, support: np.ndarray, weight: np.ndarray = None):
+        """Tally a voters x proposals support matrix in voter blocks; returns (votes, total) per proposal.
+
+        `weight` (voters x proposals, or voters x 1) scales each vote, e.g. 1/0 for
+        whether the voter voted on the proposal; by default every participant counts.
+        """
+        power = self.population.voting_power(voting_mechanism)
+        whale_power = 0.5 * power * self.population.is_whale
+        weights = np.stack([power, whale_power])
+        sums = np.zeros((2, support.shape[1]))
+        total = np.zeros(support.shape[1])
+        for start in range(0, len(power), self.chunk_size):
+            block = slice(start, start + self.chunk_size)
+            signs = np.where(support[block], 1.0, -1.0)
+            if weight is not None:
+                signs *= weight[block]
+                total += np.abs(power[block]) @ weight[block]
+            sums += weights[:, block] @ signs
+        if weight is None:
+            total[:] = np.abs(power).sum()
+        votes = sums[0] + np.where(amplify_whales, sums[1], 0.0)
+        return votes, total
+
+    def draw_arrivals(self, rng, voting_period: int, arrival_rate: float = VOTE_ARRIVAL_RATE, num_proposals: int = None) -> np.ndarray:
+        """Step offset at which each voter votes; `voting_period` marks voters who never do."""
+        participates = self.population.participates
+        if num_proposals is None:
+            arrival = rng.geometric(arrival_rate, len(self.population)) - 1
         else:
-            vote_power = 0
+            arrival = rng.geometric(arrival_rate, (len(self.population), num_proposals)) - 1
+            participates = participates[:, None]
+        return np.where(participates, np.minimum(arrival, voting_period), voting_period)
+
+    def tally_schedule(self, voting_mechanism: str, amplify_whales: bool, support: np.ndarray, arrival: np.ndarray, voting_period: int):
+        """Cumulative (votes, total voting power, undecided power) after each step of the window.
+
+        Undecided power bounds how far the remaining eligible voters (everyone who
+        has not voted yet, whether or not they will) could still swing the votes,
+        including whale amplification.
+        """
+        power = self.population.voting_power(voting_mechanism, participating_only=False)
+        amplification = 1.0 + 0.5 * self.population.is_whale * amplify_whales
+        voted = arrival < voting_period
+        signed = np.where(support, power, -power) * amplification
+        bins = np.where(voted, arrival, voting_period)
+        cum_votes = np.cumsum(np.bincount(bins, weights=np.where(voted, signed, 0.0), minlength=voting_period + 1)[:voting_period])
+        cum_total = np.cumsum(np.bincount(bins, weights=np.where(voted, np.abs(power), 0.0), minlength=voting_period + 1)[:voting_period])
+        swing = np.abs(power) * amplification
+        cum_swing = np.cumsum(np.bincount(bins, weights=np.where(voted, swing, 0.0), minlength=voting_period + 1)[:voting_period])
+        return cum_votes, cum_total, swing.sum() - cum_swing, np.abs(power).sum() - cum_total
 
-        return vote_power
+def net_vote_threshold(support_share: float) -> float:
+    """Net vote ratio (for - against) / (for + against) equivalent to a support share."""
+    return 2 * support_share - 1
 
 class Proposal:
-    def __init__(self, proposal_id: int, proposer: Voter, change_type: str, target_system: str, change_value: float):
+    def __init__(self, proposal_id: int, proposer: int, change_type: str, target_system: str, change_value: float):
         self.id = proposal_id
-        self.proposer = proposer
+        self.proposer = proposer  # voter id
         self.change_type = change_type  # e.g., 'parameter', 'allocation'
         self.target_system = target_system  # e.g., 'mcp', 'bonding_curve'
         self.change_value = change_value
         self.votes = 0
         self.total_voting_power = 0
         self.pass_threshold = MIN_VOTING_THRESHOLD
+        self.status = 'open'
+        self.submit_step = None
+        self.close_step = None
+        self.vote_schedule = None  # Cumulative (votes, total voting power) per step of the window
+
+    def current_tally(self, step: int):
+        """Votes cast so far; tallies are applied to `votes` only when voting closes."""
+        if self.vote_schedule is None:
+            return self.votes, self.total_voting_power
+        offset = min(step - self.submit_step, len(self.vote_schedule[0]) - 1)
+        if offset < 0:
+            return 0.0, 0.0
+        return float(self.vote_schedule[0][offset]), float(self.vote_schedule[1][offset])
 
     def cast_vote(self, voter: Voter, voting_mechanism: str):
         vote_power = voter.vote(self, voting_mechanism)
@@ -106,155 +631,508 @@ class Proposal:
         if voter.is_whale and self.change_type == 'parameter':
             self.votes += vote_power * 0.5  # Amplification for whale votes
 
+    def record_tally(self, votes: float, total_voting_power: float):
+        self.votes += votes
+        self.total_voting_power += total_voting_power
+
+    @property
+    def net_threshold(self) -> float:
+        return net_vote_threshold(self.pass_threshold)
+
     def is_passed(self) -> bool:
         if self.total_voting_power == 0:
             return False
+        # `votes` is net (for - against), so compare the net ratio with the equivalent of the support share
         support_ratio = self.votes / self.total_voting_power
-        return support_ratio > self.pass_threshold
+        return support_ratio > self.net_threshold
+
+class ProposalRegistry:
+    """Proposal lifecycle index: status sets, counters and a heap of close deadlines.
+
+    Outcomes are decided once, when a proposal's voting closes, and cached in
+    `proposal.status`; metrics read counters instead of re-tallying history.
+    """
+
+    def __init__(self):
+        self.proposals: List[Proposal] = []
+        self.by_id: Dict[int, Proposal] = {}
+        self.by_status: Dict[str, set] = {status: set() for status in PROPOSAL_STATUSES}
+        self._deadlines = []  # (close_step, proposal_id)
+
+    def count(self, status: str) -> int:
+        return len(self.by_status[status])
+
+    def _set_status(self, proposal: Proposal, status: str):
+        self.by_status[proposal.status].discard(proposal.id)
+        self.by_status[status].add(proposal.id)
+        proposal.status = status
+
+    def submit(self, proposal: Proposal, step: int, voting_period: int = 0):
+        proposal.close_step = step + voting_period
+        self.proposals.append(proposal)
+        self.by_id[proposal.id] = proposal
+        self.by_status['open'].add(proposal.id)
+        heapq.heappush(self._deadlines, (proposal.close_step, proposal.id))
+
+    def close_due(self, step: int, quorum_power: float = 0.0, before_close=None) -> List[Proposal]:
+        """Close every open proposal whose deadline is at or before `step`; returns them.
+
+        `before_close(proposal)` runs first, e.g. to apply the final tally.
+        """
+        closed = []
+        while self._deadlines and self._deadlines[0][0] <= step:
+            _, proposal_id = heapq.heappop(self._deadlines)
+            proposal = self.by_id[proposal_id]
+            if proposal.status != 'open':
+                continue
+            if before_close is not None:
+                before_close(proposal)
+            passed = proposal.total_voting_power >= quorum_power and proposal.is_passed()
+            self._set_status(proposal, 'passed' if passed else 'failed')
+            closed.append(proposal)
+        return closed
+
+    def mark_executed(self, proposal: Proposal):
+        self._set_status(proposal, 'executed')
+
+    @property
+    def passed_count(self) -> int:
+        # Executed proposals passed first
+        return self.count('passed') + self.count('executed')
+
+class ProposalLifecycle:
+    """submit -> voting window -> timelock -> execute, driven by event heaps.
+
+    Vote arrivals are sampled when a proposal is submitted and turned into
+    cumulative per-step tallies, so the close step (the end of the window, or
+    the first step at which the outcome is settled when early close is on) is
+    known up front. Open proposals cost nothing per step: only close and
+    execution events are visited.
+    """
+
+    def __init__(self, registry: ProposalRegistry, tally_engine: TallyEngine, voting_period: int = VOTING_PERIOD,
+                 timelock_period: int = TIMELOCK_PERIOD, quorum: float = QUORUM, early_close: bool = EARLY_CLOSE):
+        self.registry = registry
+        self.tally_engine = tally_engine
+        self.voting_period = max(1, voting_period)
+        self.timelock_period = timelock_period
+        self.quorum = quorum
+        self.early_close = early_close
+        self._executions = []  # (execute_step, proposal_id)
+
+    def quorum_power(self, voting_mechanism: str) -> float:
+        return self.quorum * np.abs(self.tally_engine.population.voting_power(voting_mechanism, participating_only=False)).sum()
+
+    def _close_offset(self, proposal: Proposal, cum_votes, cum_total, undecided_swing, undecided_power, quorum_power) -> int:
+        threshold = proposal.net_threshold
+        if not self.early_close or threshold < 0:
+            # The bounds below assume a non-negative threshold
+            return self.voting_period - 1
+        final_total = cum_total + undecided_power  # Denominator if everyone left votes
+        with np.errstate(divide='ignore', invalid='ignore'):
+            settled_pass = (cum_total >= quorum_power) & ((cum_votes - undecided_swing) > threshold * final_total) & (final_total > 0)
+            settled_fail = (final_total < quorum_power) | ((cum_votes + undecided_swing) <= threshold * cum_total)
+        settled = np.flatnonzero(settled_pass | settled_fail)
+        return int(settled[0]) if len(settled) else self.voting_period - 1
+
+    def submit(self, proposal: Proposal, step: int, voting_mechanism: str, rng):
+        engine = self.tally_engine
+        support = engine.draw_support(rng)
+        arrival = engine.draw_arrivals(rng, self.voting_period)
+        amplify_whales = proposal.change_type == 'parameter'
+        cum_votes, cum_total, undecided_swing, undecided_power = engine.tally_schedule(voting_mechanism, amplify_whales, support, arrival, self.voting_period)
+        proposal.submit_step = step
+        proposal.vote_schedule = (cum_votes, cum_total)
+        offset = self._close_offset(proposal, cum_votes, cum_total, undecided_swing, undecided_power, self.quorum_power(voting_mechanism))
+        self.registry.submit(proposal, step, offset)
+
+    def _apply_final_tally(self, proposal: Proposal):
+        proposal.record_tally(*proposal.current_tally(proposal.close_step))
+
+    def advance(self, step: int, voting_mechanism: str) -> List[Proposal]:
+        """Close due votes, queue passed proposals behind the timelock; returns proposals to execute now."""
+        for proposal in self.registry.close_due(step, self.quorum_power(voting_mechanism), self._apply_final_tally):
+            if proposal.status == 'passed':
+                heapq.heappush(self._executions, (step + self.timelock_period, proposal.id))
+
+        ready = []
+        while self._executions and self._executions[0][0] <= step:
+            _, proposal_id = heapq.heappop(self._executions)
+            ready.append(self.registry.by_id[proposal_id])
+        return ready
+
+class _Columns:
+    """Append-only set of equal-length NumPy columns with amortized O(1) appends."""
+
+    def __init__(self, dtypes: Dict[str, type], capacity: int = 256):
+        self.size = 0
+        self._data = {name: np.zeros(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._data[name][:self.size]
+
+    def extend(self, **columns):
+        count = len(next(iter(columns.values())))
+        needed = self.size + count
+        capacity = len(next(iter(self._data.values())))
+        if needed > capacity:
+            capacity = max(needed, 2 * capacity)
+            for name, array in self._data.items():
+                grown = np.zeros(capacity, dtype=array.dtype)
+                grown[:self.size] = array[:self.size]
+                self._data[name] = grown
+        for name, values in columns.items():
+            self._data[name][self.size:needed] = values
+        self.size = needed
+
+    def append(self, **values):
+        self.extend(**{name: [value] for name, value in values.items()})
 
 class Treasury:
+    """Treasury funds with an append-only ledger and streaming payments.
+
+    Every movement is a ledger row (step, proposal id, kind, amount); running
+    totals make the aggregate getters O(1). Streams pay `rate` per step from
+    `start` until `end` (-1 for open-ended recurring budgets), plus an optional
+    `lump` on the first step (vesting that accrued during a cliff).
+    """
+
+    ALLOCATION, FEE, STREAM = 0, 1, 2
+
     def __init__(self, initial_funds: float):
         self.funds = initial_funds
-        self.allocation_history = []
+        self.ledger = _Columns({'step': np.int64, 'proposal_id': np.int64, 'kind': np.int8, 'amount': np.float64})
+        self.streams = _Columns({'proposal_id': np.int64, 'rate': np.float64, 'lump': np.float64, 'start': np.int64, 'end': np.int64})
+        self.total_allocated = 0.0
+        self.total_streamed = 0.0
+        self.total_fees = 0.0
+        self.step = 0
+        self.paid_through = -1  # Last step whose stream payments were made
+
+    @property
+    def allocation_history(self) -> List[tuple]:
+        """(proposal id, amount) for every payment out, as the previous list-based history."""
+        paid = self.ledger['kind'] != self.FEE
+        return list(zip(self.ledger['proposal_id'][paid].tolist(), self.ledger['amount'][paid].tolist()))
 
     def allocate_funds(self, amount: float, proposal: Proposal) -> bool:
         if self.funds >= amount:
             self.funds -= amount
-            self.allocation_history.append((proposal.id, amount))
+            self.total_allocated += amount
+            self.ledger.append(step=self.step, proposal_id=proposal.id, kind=self.ALLOCATION, amount=amount)
             return True
         return False
 
     def receive_fees(self, amount: float):
         self.funds += amount
+        self.total_fees += amount
+        self.ledger.append(step=self.step, proposal_id=-1, kind=self.FEE, amount=amount)
 
     def get_total_allocated(self) -> float:
-        return sum(amount for _, amount in self.allocation_history)
+        return self.total_allocated + self.total_streamed
+
+    def add_vesting_grant(self, proposal: Proposal, total: float, duration: int, cliff: int = 0) -> bool:
+        """Vest `total` linearly over `duration` steps from now; nothing is paid before `cliff`.
+
+        The grant must fit in the funds left after every payment still owed to
+        earlier streams (open-ended budgets counted over this grant's duration).
+        """
+        if duration <= 0:
+            return False
+        horizon = max(duration, int(self.streams['end'].max(initial=0)) - self.step)
+        if self.funds - self.committed_outflows(horizon).sum() < total:
+            return False
+        rate = total / duration
+        cliff = min(cliff, duration - 1)
+        self.streams.append(proposal_id=proposal.id, rate=rate, lump=rate * cliff,
+                            start=self.step + cliff, end=self.step + duration)
+        return True
+
+    def add_recurring_budget(self, proposal: Proposal, amount_per_step: float, num_steps: int = None):
+        self.streams.append(proposal_id=proposal.id, rate=amount_per_step, lump=0.0,
+                            start=self.step, end=-1 if num_steps is None else self.step + num_steps)
+
+    def _stream_payments(self, steps: np.ndarray) -> np.ndarray:
+        """Scheduled payments, streams x steps."""
+        start, end = self.streams['start'][:, None], self.streams['end'][:, None]
+        active = (steps >= start) & ((end < 0) | (steps < end))
+        return np.where(active, self.streams['rate'][:, None], 0.0) + np.where(steps == start, self.streams['lump'][:, None], 0.0)
+
+    def process_streams(self, step: int):
+        """Pay every stream due at `step`; scaled down pro rata when funds run short."""
+        self.step = step
+        self.paid_through = step
+        if not len(self.streams):
+            return
+        due = self._stream_payments(np.array([step]))[:, 0]
+        paying = np.flatnonzero(due > 0)
+        if not len(paying):
+            return
+        amounts = due[paying] * min(1.0, max(self.funds, 0.0) / due[paying].sum())
+        self.funds -= amounts.sum()
+        self.total_streamed += amounts.sum()
+        self.ledger.extend(step=np.full(len(paying), step), proposal_id=self.streams['proposal_id'][paying],
+                           kind=np.full(len(paying), self.STREAM), amount=amounts)
+
+    def committed_outflows(self, num_steps: int) -> np.ndarray:
+        """Scheduled stream payments for each of the next `num_steps` steps not paid yet."""
+        if not len(self.streams):
+            return np.zeros(num_steps)
+        first = self.paid_through + 1
+        return self._stream_payments(np.arange(first, first + num_steps)[None, :]).sum(axis=0)
+
+    def project_cash_flow(self, num_steps: int = PROJECTION_STEPS, allocation_rate: float = PROPOSAL_SUBMISSION_RATE,
+                          num_paths: int = PROJECTION_PATHS, rng=None) -> Dict:
+        """Monte Carlo projection of funds under committed streams and random future allocations.
+
+        Each step, with probability `allocation_rate`, a proposal allocates a
+        uniform 0-10% of current funds (less fee income), then streams pay. The
+        recurrence F[t+1] = m[t] * F[t] - s[t] is solved for all paths at once
+        with cumulative products. Runway is the first step at which funds go
+        negative (`num_steps` if never).
+        """
+        rng = rng or np.random.default_rng()
+        allocations = (rng.random((num_paths, num_steps)) < allocation_rate) * rng.uniform(0.0, 0.1, (num_paths, num_steps))
+        retained = 1.0 - allocations * (1.0 - TREASURY_FEE_RATE)
+        outflows = self.committed_outflows(num_steps)
+
+        growth = np.cumprod(retained, axis=1)  # growth[:, t] = product of m[0..t]
+        funds = growth * (self.funds - np.cumsum(outflows / growth, axis=1))
+        depleted = funds < 0
+        runway = np.where(depleted.any(axis=1), depleted.argmax(axis=1), num_steps)
+        return {
+            'funds_quantiles': np.quantile(funds, [0.05, 0.5, 0.95], axis=0),
+            'runway': runway,
+            'depletion_probability': float(depleted.any(axis=1).mean()),
+        }
+
+def build_population(num_voters: int, rng, snapshot: HoldingsSnapshot = None, delegation_rate: float = 0.0) -> VoterPopulation:
+    """Voters seeded from `snapshot` (or one found on disk), else synthetic holdings.
+
+    Delegates are drawn last, so populations built with the same seed share
+    holdings and participation whatever the delegation rate.
+    """
+    snapshot = snapshot or HoldingsSnapshot.discover()
+    if snapshot is None:
+        print(f"Warning: no holdings snapshot found at {HOLDINGS_SNAPSHOT_PATH} or {AFFILIATE_OUTPUT_PATH}. Using synthetic data.")
+    if snapshot is None or not len(snapshot):
+        population = VoterPopulation.from_holdings(rng.normal(100, 20, num_voters), 120, rng)
+    else:
+        whale_threshold = np.median(snapshot.holdings) * WHALE_THRESHOLD_MULTIPLIER
+        population = VoterPopulation.from_holdings(snapshot.sample(num_voters, rng), whale_threshold, rng)
+    if delegation_rate > 0:
+        population.assign_random_delegates(delegation_rate, rng)
+    return population
 
 class Simulation:
-    def __init__(self, num_voters: int, voting_mechanism: str):
+    def __init__(self, num_voters: int, voting_mechanism: str, seed: int = None, holdings: HoldingsSnapshot = None):
         self.num_voters = num_voters
         self.voting_mechanism = voting_mechanism
-        self.voters: List[Voter] = []
-        self.proposals: List[Proposal] = []
+        # Separate streams for the population and for proposals/votes, so runs with the same seed
+        # see the same proposals and vote draws whichever mechanism builds extra population state
+        population_seed, proposal_seed = np.random.SeedSequence(seed).spawn(2)
+        self.population_rng = np.random.default_rng(population_seed)
+        self.rng = np.random.default_rng(proposal_seed)
+        self.population: VoterPopulation = None
+        self.registry = ProposalRegistry()
         self.treasury = Treasury(TREASURY_INITIAL)
         self.proposal_count = 0
         self.metrics_history = []
 
         # Load data from other simulations
-        self.load_external_data()
-
-    def load_external_data(self):
-        # Simplified: Load token holdings from affiliate simulation
-        affiliate_output_path = os.path.join('..', 'affiliate', 'output.txt')
-        try:
-            with open(affiliate_output_path, 'r') as f:
-                content = f.read()
-            # Parse final balances or holdings (simplified parsing)
-            lines = content.split('\n')
-            holdings = []
-            for line in lines:
-                if 'Final Base Currency:' in line:
-                    # Extract holding values (simplified)
-                    holdings.append(float(line.split(':')[1].strip()))
-
-            if holdings:
-                median_holdings = np.median(holdings)
-                whale_threshold = median_holdings * WHALE_THRESHOLD_MULTIPLIER
-                for i in range(self.num_voters):
-                    full_holdings = holdings[i % len(holdings)] if holdings else 100
-                    is_whale = full_holdings > whale_threshold
-                    self.voters.append(Voter(i, full_holdings, is_whale))
-
-                # Handle delegation randomly for delegation mechanism
-                if self.voting_mechanism == 'delegation':
-                    for voter in self.voters:
-                        if random.random() < 0.3:  # 30% delegation rate
-                            voter.delegated_to = random.choice([v for v in self.voters if v.id != voter.id])
-            else:
-                # Fallback if no data
-                for i in range(self.num_voters):
-                    holdings = np.random.normal(100, 20)
-                    is_whale = holdings > 120
-                    self.voters.append(Voter(i, holdings, is_whale))
-        except FileNotFoundError:
-            print(f"Warning: {affiliate_output_path} not found. Using synthetic data.")
-            for i in range(self.num_voters):
-                holdings = np.random.normal(100, 20)
-                is_whale = holdings > 120
-                self.voters.append(Voter(i, holdings, is_whale))
+        self.load_external_data(holdings)
+        self.tally_engine = TallyEngine(self.population)
+        self.lifecycle = ProposalLifecycle(self.registry, self.tally_engine)
+        self.holdings_metrics = HoldingsMetrics(self.population.token_holdings)
+        # Concentration of control is measured on the weight actually cast under this mechanism
+        self.power_metrics = HoldingsMetrics(self.population.voting_power(self.voting_mechanism))
+
+    @property
+    def proposals(self) -> List[Proposal]:
+        return self.registry.proposals
+
+    @property
+    def voters(self) -> List[Voter]:
+        return [Voter(self.population, i) for i in range(len(self.population))]
+
+    def load_external_data(self, snapshot: HoldingsSnapshot = None):
+        # Token holdings from another simulation: an explicit snapshot, else the affiliate outputs on disk
+        delegation_rate = DELEGATION_RATE if self.voting_mechanism == 'delegation' else 0.0
+        self.population = build_population(self.num_voters, self.population_rng, snapshot, delegation_rate)
 
     def generate_proposal(self) -> Proposal:
-        proposer = random.choice(self.voters)
-        change_type = random.choice(['parameter', 'allocation'])
-        target_system = random.choice(['mcp', 'bonding_curve', 'affiliate', 'airdrop'])
-        change_value = random.uniform(-0.1, 0.1)  # Parameter adjustment or allocation percentage
+        proposer = int(self.rng.integers(len(self.population)))
+        change_type = ['parameter', 'allocation'][self.rng.integers(2)]
+        target_system = ['mcp', 'bonding_curve', 'affiliate', 'airdrop'][self.rng.integers(4)]
+        change_value = self.rng.uniform(-0.1, 0.1)  # Parameter adjustment or allocation percentage
 
         self.proposal_count += 1
         return Proposal(self.proposal_count, proposer, change_type, target_system, change_value)
 
     def run_step(self, step: int):
         # Generate proposal
-        if random.random() < PROPOSAL_SUBMISSION_RATE:
+        if self.rng.random() < PROPOSAL_SUBMISSION_RATE:
             proposal = self.generate_proposal()
-            self.proposals.append(proposal)
+            self.lifecycle.submit(proposal, step, self.voting_mechanism, self.rng)
 
-            # Voting
-            for voter in self.voters:
-                proposal.cast_vote(voter, self.voting_mechanism)
-
-            # Check if passed and execute
-            if proposal.is_passed():
-                if proposal.change_type == 'allocation':
-                    amount = self.treasury.funds * abs(proposal.change_value)
-                    self.treasury.allocate_funds(amount, proposal)
-                    self.treasury.receive_fees(amount * 0.01)  # Small fee income
+        # Close due votes and execute proposals whose timelock has expired
+        self.treasury.step = step
+        for proposal in self.lifecycle.advance(step, self.voting_mechanism):
+            if proposal.change_type == 'allocation':
+                amount = self.treasury.funds * abs(proposal.change_value)
+                if self.rng.random() < GRANT_STREAM_SHARE:
+                    granted = self.treasury.add_vesting_grant(proposal, amount, GRANT_VESTING_STEPS, GRANT_CLIFF_STEPS)
+                else:
+                    granted = self.treasury.allocate_funds(amount, proposal)
+                if granted:
+                    self.registry.mark_executed(proposal)
+                self.treasury.receive_fees(amount * TREASURY_FEE_RATE)  # Small fee income
+            else:
+                self.registry.mark_executed(proposal)
+        self.treasury.process_streams(step)
 
         # Record metrics
-        participation_rate = sum(1 for v in self.voters if v.participates) / len(self.voters)
-        active_proposals = len([p for p in self.proposals if not p.is_passed()])
+        participation_rate = np.mean(self.population.participates)
+        registry = self.registry
         metrics = {
             'step': step,
             'participation_rate': participation_rate,
-            'active_proposals': active_proposals,
+            # Everything not passed, as before: open and failed proposals
+            'active_proposals': registry.count('open') + registry.count('failed'),
+            'open_proposals': registry.count('open'),
+            'failed_proposals': registry.count('failed'),
+            'executed_proposals': registry.count('executed'),
             'treasury_funds': self.treasury.funds,
             'gini_coefficient': self.calculate_gini(),
-            'passed_proposals': len([p for p in self.proposals if p.is_passed()]),
+            'nakamoto_coefficient': self.power_metrics.nakamoto_coefficient(),
+            'top10_share': self.power_metrics.top_share(TOP_HOLDERS),
+            'passed_proposals': registry.passed_count,
         }
         self.metrics_history.append(metrics)
 
     def calculate_gini(self) -> float:
-        holdings = [v.token_holdings for v in self.voters]
-        if not holdings:
-            return 0
-        holdings.sort()
-        n = len(holdings)
-        numerator = sum((2 * i - n - 1) * holding for i, holding in enumerate(holdings))
-        denominator = n * sum(holdings)
-        return numerator / denominator if denominator > 0 else 0
-
-    def run_simulation(self) -> Dict:
-        for step in range(SIMULATION_STEPS):
+        return self.holdings_metrics.gini()
+
+    def project_treasury(self, num_steps: int = PROJECTION_STEPS) -> Dict:
+        # Allocation rate observed so far, falling back to the submission rate before any history
+        steps_run = len(self.metrics_history)
+        executed_allocations = int(np.count_nonzero(self.treasury.ledger['kind'] == Treasury.ALLOCATION)) + len(self.treasury.streams)
+        allocation_rate = executed_allocations / steps_run if steps_run else PROPOSAL_SUBMISSION_RATE
+        return self.treasury.project_cash_flow(num_steps, allocation_rate, rng=self.rng)
+
+    def run_simulation(self, num_steps: int = SIMULATION_STEPS) -> Dict:
+        for step in range(num_steps):
             self.run_step(step)
 
         # Compile results
         metrics_df = pd.DataFrame(self.metrics_history)
         final_metrics = {
             'total_participation': np.mean([m['participation_rate'] for m in self.metrics_history]),
-            'passed_proposals_count': len([p for p in self.proposals if p.is_passed()]),
+            'passed_proposals_count': self.registry.passed_count,
             'final_treasury': self.treasury.funds,
+            'total_allocated': self.treasury.get_total_allocated(),
+            'treasury_projection': self.project_treasury(),
             'final_gini': self.metrics_history[-1]['gini_coefficient'],
             'voting_mechanism': self.voting_mechanism,
-            'whale_influence': sum(1 for v in self.voters if v.is_whale) / len(self.voters),
+            'whale_influence': np.mean(self.population.is_whale),
             'metrics_history': metrics_df.to_dict('records')
         }
         return final_metrics
 
+# Mechanism comparison
+def mechanism_outcomes(engine: TallyEngine, support: np.ndarray, arrival: np.ndarray, amplify_whales: np.ndarray,
+                       voting_period: int = VOTING_PERIOD) -> Dict[str, np.ndarray]:
+    """Pass/fail per proposal for every mechanism in COMPARISON_MECHANISMS, from one shared intent draw.
+
+    `support` and `arrival` are voters x proposals; a voter votes on a proposal
+    when its arrival offset falls inside the window. Ratio mechanisms pass
+    like the lifecycle: a support share above MIN_VOTING_THRESHOLD with QUORUM
+    of eligible power. Conviction weights each vote by how long it was staked.
+    Holographic consensus boosts proposals whose participating whales, staking
+    as predictors, favour them HOLOGRAPHIC_BOOST_RATIO to 1; boosted ones need
+    a relative majority, the rest an absolute majority of all token-weighted power.
+    """
+    population = engine.population
+    voted = (arrival < voting_period).astype(np.float64)
+    conviction = voted * (1.0 - CONVICTION_DECAY ** (voting_period - arrival))
+    threshold = net_vote_threshold(MIN_VOTING_THRESHOLD)
+
+    outcomes = {}
+    for m in ['simple', 'quadratic', 'delegation', 'conviction']:
+        base = 'simple' if m == 'conviction' else m
+        votes, total = engine.tally_matrix(base, amplify_whales, support, conviction if m == 'conviction' else voted)
+        eligible = np.abs(population.voting_power(base, participating_only=False)).sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(total > 0, votes / total, -np.inf)
+        outcomes[m] = (ratio > threshold) & (total >= QUORUM * eligible)
+
+    # Net and total give for = (total + net) / 2 and against = (total - net) / 2
+    unamplified = np.zeros(len(amplify_whales), dtype=bool)
+    net, cast = engine.tally_matrix('simple', unamplified, support, voted)
+    stake_net, stake = engine.tally_matrix('simple', unamplified, support, population.is_whale[:, None].astype(np.float64))
+    boosted = stake + stake_net > HOLOGRAPHIC_BOOST_RATIO * (stake - stake_net)
+    eligible = population.voting_power('simple', participating_only=False).sum()
+    outcomes['holographic'] = np.where(boosted, net > 0, cast + net > eligible)
+    return outcomes
+
+def compare_mechanisms(seed: int, num_voters: int = NUM_VOTERS, num_proposals: int = COMPARISON_PROPOSALS, holdings_path: str = None) -> Dict[str, Dict[str, float]]:
+    """Evaluate every comparison mechanism on one population and one vote-intent matrix."""
+    population_seed, intent_seed = np.random.SeedSequence(seed).spawn(2)
+    snapshot = HoldingsSnapshot.from_file(holdings_path) if holdings_path else None
+    population = build_population(num_voters, np.random.default_rng(population_seed), snapshot, DELEGATION_RATE)
+
+    rng = np.random.default_rng(intent_seed)
+    engine = TallyEngine(population)
+    support = engine.draw_support(rng, num_proposals)
+    arrival = engine.draw_arrivals(rng, VOTING_PERIOD, num_proposals=num_proposals)
+    amplify_whales = rng.random(num_proposals) < 0.5  # Parameter proposals
+
+    voted = arrival < VOTING_PERIOD
+    head_majority = (voted & support).sum(axis=0) > (voted & ~support).sum(axis=0)
+    results = {}
+    for mechanism, passed in mechanism_outcomes(engine, support, arrival, amplify_whales).items():
+        results[mechanism] = {
+            'pass_rate': float(passed.mean()),
+            'majority_agreement': float(np.mean(passed == head_majority)),  # Outcome matches the head-count majority
+        }
+    return results
+
+def bootstrap_ci(values: np.ndarray, rng, num_resamples: int = COMPARISON_BOOTSTRAP, level: float = 0.95):
+    """Percentile bootstrap confidence interval for the mean."""
+    values = np.asarray(values, dtype=np.float64)
+    means = values[rng.integers(0, len(values), (num_resamples, len(values)))].mean(axis=1)
+    tail = (1 - level) / 2
+    return float(np.quantile(means, tail)), float(np.quantile(means, 1 - tail))
+
+def run_comparison(seeds=range(COMPARISON_SEEDS), baseline: str = 'simple', max_workers: int = None, **kwargs) -> Dict[str, Dict[str, Dict]]:
+    """Run `compare_mechanisms` for each seed in parallel processes and pair every mechanism with `baseline`.
+
+    Returns {mechanism: {metric: {'mean', 'diff', 'ci'}}} where 'diff' is the mean
+    paired difference to the baseline over seeds and 'ci' its bootstrap interval.
+    """
+    seeds = list(seeds)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        per_seed = list(executor.map(functools.partial(compare_mechanisms, **kwargs), seeds))
+
+    rng = np.random.default_rng(COMPARISON_SEED)
+    report = {}
+    for mechanism in per_seed[0]:
+        report[mechanism] = {}
+        for metric in per_seed[0][mechanism]:
+            values = np.array([r[mechanism][metric] for r in per_seed])
+            diffs = values - np.array([r[baseline][metric] for r in per_seed])
+            report[mechanism][metric] = {'mean': float(values.mean()), 'diff': float(diffs.mean()), 'ci': bootstrap_ci(diffs, rng)}
+    return report
+
 # Main execution
 def main():
     results = []
     for voting_mechanism in VOTING_MECHANISMS:
         print(f"Running simulation with {voting_mechanism} voting...")
-        sim = Simulation(NUM_VOTERS, voting_mechanism)
+        sim = Simulation(NUM_VOTERS, voting_mechanism, seed=COMPARISON_SEED)
         result = sim.run_simulation()
         results.append(result)
 
@@ -263,6 +1141,8 @@ def main():
         print(f"  Final Gini Coefficient: {result['final_gini']:.4f}")
         print(f"  Final Treasury Funds: ${result['final_treasury']:.2f}")
         print(f"  Whale Influence: {result['whale_influence']:.2%}")
+        projection = result['treasury_projection']
+        print(f"  Treasury Depletion Risk ({PROJECTION_STEPS} steps): {projection['depletion_probability']:.2%}")
         print("-" * 50)
 
     # Cross-mechanism comparison
@@ -290,5 +1170,25 @@ def main():
 
     print("\nSimulation complete. Results saved to governance-dao/output.png")
 
+    # Treasury scenario: a longer run, so passed allocations pay out as lump sums and vesting grants
+    sim = Simulation(NUM_VOTERS, 'simple', seed=COMPARISON_SEED)
+    result = sim.run_simulation(TREASURY_SCENARIO_STEPS)
+    treasury = sim.treasury
+    kinds = treasury.ledger['kind']
+    print(f"\nTreasury scenario ({TREASURY_SCENARIO_STEPS} steps, simple voting):")
+    print(f"  Passed Proposals: {result['passed_proposals_count']}")
+    print(f"  Lump-Sum Allocations: {np.count_nonzero(kinds == Treasury.ALLOCATION)} (${treasury.total_allocated:.2f})")
+    print(f"  Vesting Grants: {len(treasury.streams)} ({np.count_nonzero(kinds == Treasury.STREAM)} payments, ${treasury.total_streamed:.2f})")
+    print(f"  Final Treasury Funds: ${result['final_treasury']:.2f}")
+    projection = result['treasury_projection']
+    print(f"  Treasury Depletion Risk ({PROJECTION_STEPS} steps): {projection['depletion_probability']:.2%}")
+
+    # Paired comparison: every mechanism sees the same population and vote intents per seed
+    print(f"\nPaired mechanism comparison over {COMPARISON_SEEDS} seeds (difference to simple voting, 95% CI):")
+    report = run_comparison()
+    for mechanism, metrics in report.items():
+        summary = ", ".join(f"{metric} {m['mean']:.3f} ({m['diff']:+.3f} [{m['ci'][0]:+.3f}, {m['ci'][1]:+.3f}])" for metric, m in metrics.items())
+        print(f"  {mechanism}: {summary}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
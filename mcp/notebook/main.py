@@ -33,10 +33,26 @@ and agent welfare under various policy configurations.
 """
 import numpy as np
 import time
-import random
 import logging
+import dataclasses
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import matplotlib.pyplot as plt
 
+try:
+    from scipy.stats import qmc
+except ImportError:  # SciPy is optional; Sobol designs then fall back to plain Monte Carlo
+    qmc = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # PyArrow is optional; time series then go to .npy memmaps only
+    pa = pq = None
+
 # --- Constants ---
 NUM_AGENTS = 50
 NUM_RESOURCES = 3
@@ -59,351 +75,926 @@ TAX_RATE = 0.02
 RESOURCE_CAPACITY_MULTIPLIER = 0.005
 INITIAL_IMBALANCE = True
 IMBALANCE_STRENGTH = 0.5
+ALLOCATION_POLICY = 'first_come'  # 'first_come', 'pro_rata' or 'auction'
+INEQUALITY_TOP_K = 5
+INEQUALITY_CHECKPOINT_STRIDE = 1000  # Top-k share and Theil index every N steps
+ARCHETYPE_MIX = (('baseline', 1.0),)  # (archetype, weight) pairs; see ARCHETYPES
+MARKET_CLEARING = False  # Solve for clearing prices before allocation each step
+MARKET_CLEARING_TOLERANCE = 1e-3  # Max relative excess demand accepted as cleared
+MARKET_CLEARING_MAX_ITERATIONS = 50  # Demand evaluations per step
+PROFILE_PHASES = False  # Time each simulation_step phase with perf_counter_ns
+PROFILE_WINDOW = 1000  # Steps per profiling window
+TIMESERIES_STRIDE = 10  # Record resource state and balance quantiles every N steps
+TIMESERIES_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+TIMESERIES_CHUNK_ROWS = 4096  # Rows buffered between Parquet row-group writes
+SWEEP_BOUNDS = {
+    'price_elasticity': (0.01, 0.1),
+    'resource_regen_rate': (0.005, 0.02),
+    'tax_rate': (0.0, 0.05),
+    'agent_expense_rate': (0.1, 0.5),
+}
+SWEEP_METRICS = ('avg_final_balance', 'gini_coefficient', 'num_bankruptcies', 'avg_final_resource_price')
+SWEEP_SOBOL_SAMPLES = 16  # Base samples N; a Saltelli design runs N * (d + 2) simulations
+SWEEP_CHECKPOINT = "sweep_checkpoint.jsonl"
+
+# --- Run Configuration ---
+@dataclasses.dataclass(frozen=True)
+class SimulationConfig:
+    """Immutable parameters of one run; defaults mirror the module constants.
+
+    Agent and resource pools keep a reference to it instead of reading module
+    globals, so concurrent runs with different parameters never interfere.
+    """
+    num_agents: int = NUM_AGENTS
+    num_resources: int = NUM_RESOURCES
+    simulation_steps: int = SIMULATION_STEPS
+    initial_ctx_balance: float = INITIAL_CTX_BALANCE
+    resource_capacity: float = RESOURCE_CAPACITY
+    base_resource_cost: float = BASE_RESOURCE_COST
+    price_elasticity: float = PRICE_ELASTICITY
+    deallocation_rate: float = DEALLOCATION_RATE
+    agent_income: float = AGENT_INCOME
+    resource_regen_rate: float = RESOURCE_REGEN_RATE
+    max_resource_capacity: float = MAX_RESOURCE_CAPACITY
+    agent_expense_rate: float = AGENT_EXPENSE_RATE
+    min_agent_balance: float = MIN_AGENT_BALANCE
+    bankruptcy_threshold: float = BANKRUPTCY_THRESHOLD
+    dynamic_income_multiplier: float = DYNAMIC_INCOME_MULTIPLIER
+    dynamic_regen_multiplier: float = DYNAMIC_REGEN_MULTIPLIER
+    agent_income_ceiling: float = AGENT_INCOME_CEILING
+    tax_rate: float = TAX_RATE
+    resource_capacity_multiplier: float = RESOURCE_CAPACITY_MULTIPLIER
+    initial_imbalance: bool = INITIAL_IMBALANCE
+    imbalance_strength: float = IMBALANCE_STRENGTH
+    allocation_policy: str = ALLOCATION_POLICY
+    archetype_mix: tuple = ARCHETYPE_MIX
+    market_clearing: bool = MARKET_CLEARING
+    market_clearing_tolerance: float = MARKET_CLEARING_TOLERANCE
+    market_clearing_max_iterations: int = MARKET_CLEARING_MAX_ITERATIONS
+    profile_phases: bool = PROFILE_PHASES
+    profile_window: int = PROFILE_WINDOW
+    profile_path: str = None  # Collapsed-stack output (flamegraph.pl / speedscope) when profiling
+    timeseries_stride: int = TIMESERIES_STRIDE
+    timeseries_path: str = None  # Directory for .npy memmaps or a *.parquet file; None keeps arrays in memory
+    seed: int = None  # None draws fresh entropy
+
+    def replace(self, **changes):
+        return dataclasses.replace(self, **changes)
 
 # --- Logging Configuration ---
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- Agent Archetypes ---
+# Demand functions map (preference, prices, demand multiplier, base cost) for one
+# contiguous block of agents to the requested amounts before the shared
+# availability and affordability checks.
+def _linear_demand(preference, prices, multiplier, base_cost):
+    return preference * (1.0 - prices / (base_cost * 5)) * multiplier[:, None]
+
+def _batch_demand(preference, prices, multiplier, base_cost):
+    # Large, flexible jobs: buy in bulk but walk away early as prices rise
+    return 1.5 * preference * np.maximum(0.0, 1.0 - prices / (base_cost * 3)) * multiplier[:, None]
+
+def _latency_sensitive_demand(preference, prices, multiplier, base_cost):
+    # Interactive workloads: nearly price-inelastic up to a high choke price
+    return preference * np.maximum(0.0, 1.0 - prices / (base_cost * 20)) * multiplier[:, None]
+
+def _hoarder_demand(preference, prices, multiplier, base_cost):
+    # Speculators: stock up while resources are cheap, stop above twice the base cost
+    return 2.0 * preference * np.maximum(0.0, 2.0 - prices / base_cost) * multiplier[:, None]
+
+class AgentArchetype:
+    # `choke_price` is the price, in multiples of base cost, at which `demand` reaches zero
+    def __init__(self, name, demand, choke_price, income_scale=1.0, expense_scale=1.0):
+        self.name = name
+        self.demand = demand
+        self.choke_price = choke_price
+        self.income_scale = income_scale
+        self.expense_scale = expense_scale
+
+ARCHETYPES = {
+    'baseline': AgentArchetype('baseline', _linear_demand, 5),
+    'batch': AgentArchetype('batch', _batch_demand, 3, income_scale=1.2),
+    'latency_sensitive': AgentArchetype('latency_sensitive', _latency_sensitive_demand, 20, income_scale=1.5, expense_scale=1.5),
+    'hoarder': AgentArchetype('hoarder', _hoarder_demand, 2, income_scale=0.8, expense_scale=0.5),
+}
+
+def get_archetype(name):
+    if name not in ARCHETYPES:
+        raise ValueError(f"Unknown agent archetype: {name}")
+    return ARCHETYPES[name]
+
 # --- Model Definition ---
-class Agent:
-    def __init__(self, agent_id):
-        self.agent_id = agent_id
-        self.ctx_balance = INITIAL_CTX_BALANCE
-        self.resource_demand_preference = np.random.uniform(size=NUM_RESOURCES).astype(np.float32)
-        self.demand_multiplier = 0.1
-        self.is_bankrupt = False
-        logging.debug(f"Agent {self.agent_id} created with initial balance {self.ctx_balance} and resource needs {self.resource_demand_preference}")
+class _ActiveView:
+    """Exposes the live prefix of a capacity-sized agent array as a plain attribute."""
+
+    def __set_name__(self, owner, name):
+        self.storage = '_' + name
+
+    def __get__(self, pool, owner=None):
+        if pool is None:
+            return self
+        return getattr(pool, self.storage)[:pool.size]
+
+    def __set__(self, pool, value):
+        getattr(pool, self.storage)[:pool.size] = value
+
+class AgentPool:
+    """Array-backed agent state: one row per live agent, one column per resource.
+
+    Live agents occupy the dense prefix `[:size]` of every array, grouped into one
+    contiguous block per archetype (`block_end[k]` is the end of block k). Removing
+    an agent moves the last row of its block into the hole, then the last row of
+    each later block into the hole left behind, so removal is O(archetypes) and
+    every phase touches live agents only. `slot_of` maps agent ids to slots (-1
+    once removed) and `alive` is the matching boolean mask by agent id.
+    """
+
+    agent_id = _ActiveView()
+    ctx_balance = _ActiveView()
+    resource_demand_preference = _ActiveView()
+    demand_multiplier = _ActiveView()
+    is_bankrupt = _ActiveView()
+
+    def __init__(self, config, rng):
+        self.config = config
+        self.rng = rng
+        num_agents = config.num_agents
+        self.size = num_agents
+        self._agent_id = np.arange(num_agents)
+        self._ctx_balance = np.full(num_agents, config.initial_ctx_balance, dtype=np.float64)
+        self._resource_demand_preference = rng.uniform(size=(num_agents, config.num_resources)).astype(np.float32)
+        self._demand_multiplier = np.full(num_agents, 0.1)
+        self._is_bankrupt = np.zeros(num_agents, dtype=bool)
+        self.slot_of = np.arange(num_agents)
+        self.alive = np.ones(num_agents, dtype=bool)
+        self.bankruptcy_log = []  # (step, agent_id, balance)
+
+        names, weights = zip(*config.archetype_mix)
+        self.archetypes = [get_archetype(name) for name in names]
+        self.block_end = [int(end) for end in np.round(np.cumsum(weights) / np.sum(weights) * num_agents)]
+        logging.debug(f"Created {num_agents} agents with initial balance {config.initial_ctx_balance}")
+
+    def __len__(self):
+        return self.size
+
+    def blocks(self):
+        """Yield (archetype, slice) for each archetype's block of live agents."""
+        start = 0
+        for archetype, end in zip(self.archetypes, self.block_end):
+            yield archetype, slice(start, end)
+            start = end
+
+    def _per_agent(self, attribute):
+        sizes = np.diff(self.block_end, prepend=0)
+        return np.repeat([getattr(archetype, attribute) for archetype in self.archetypes], sizes)
 
     def request_resources(self, resource_prices, resource_availability):
-        if self.is_bankrupt:
-            return []
-        requests = []
-        for i in range(NUM_RESOURCES):
-            demand = self.resource_demand_preference[i] * (1.0 - resource_prices[i] / (BASE_RESOURCE_COST * 5)) * self.demand_multiplier
-            demand = np.clip(demand, 0.0, resource_availability[i])
-            if self.ctx_balance >= resource_prices[i] * demand and self.ctx_balance > MIN_AGENT_BALANCE:
-                requests.append((i, demand))
-        return requests
+        preference = self.resource_demand_preference
+        multiplier = self.demand_multiplier
+        base_cost = self.config.base_resource_cost
+        demand = np.empty(preference.shape)
+        for archetype, block in self.blocks():
+            demand[block] = archetype.demand(preference[block], resource_prices, multiplier[block], base_cost)
+        demand = np.clip(demand, 0.0, resource_availability)
+        balance = self.ctx_balance[:, None]
+        requested = (balance >= resource_prices * demand) & (balance > self.config.min_agent_balance) & ~self.is_bankrupt[:, None]
+        return np.where(requested, demand, 0.0)
+
+    def apply_imbalance(self, strength):
+        """Double the balance of the first `strength` share of every archetype block and halve the rest.
+
+        Applied per block, so starting wealth is spread the same way in every archetype.
+        """
+        for _, block in self.blocks():
+            size = block.stop - block.start
+            self.ctx_balance[block] *= np.where(np.arange(size) < size * strength, 2, 0.5)
 
     def adjust_needs(self):
-        change = np.random.uniform(size=NUM_RESOURCES, low=-0.1, high=0.1).astype(np.float32)
+        change = self.rng.uniform(size=self.resource_demand_preference.shape, low=-0.1, high=0.1).astype(np.float32)
         self.resource_demand_preference = np.clip(self.resource_demand_preference + change, 0.0, 1.0)
 
     def adjust_demand_multiplier(self, step_num):
-        self.demand_multiplier = min(1.0, self.demand_multiplier + (0.9 / SIMULATION_STEPS))
+        np.minimum(1.0, self.demand_multiplier + (0.9 / self.config.simulation_steps), out=self.demand_multiplier)
 
     def add_income(self, avg_resource_price):
-        income = min(AGENT_INCOME + DYNAMIC_INCOME_MULTIPLIER * avg_resource_price, AGENT_INCOME_CEILING)
-        self.ctx_balance += income
+        config = self.config
+        income = min(config.agent_income + config.dynamic_income_multiplier * avg_resource_price, config.agent_income_ceiling)
+        self.ctx_balance += income * self._per_agent('income_scale')
 
     def add_expense(self):
-        self.ctx_balance -= AGENT_EXPENSE_RATE * (1 + random.uniform(-0.2, 0.2))
+        noise = 1 + self.rng.uniform(-0.2, 0.2, size=len(self))
+        self.ctx_balance -= self.config.agent_expense_rate * self._per_agent('expense_scale') * noise
 
-    def tax(self, tax_amount):
-        self.ctx_balance -= tax_amount
+    def tax(self, tax_rate):
+        tax_amounts = self.ctx_balance * tax_rate
+        self.ctx_balance -= tax_amounts
+        return tax_amounts.sum()
 
     def check_bankrupt(self):
-        if self.ctx_balance <= BANKRUPTCY_THRESHOLD and not self.is_bankrupt:
-            self.is_bankrupt = True
-            logging.debug(f"Agent {self.agent_id} is bankrupt.")
+        newly_bankrupt = (self.ctx_balance <= self.config.bankruptcy_threshold) & ~self.is_bankrupt
+        if newly_bankrupt.any():
+            logging.debug(f"Agents {self.agent_id[newly_bankrupt].tolist()} are bankrupt.")
+        self.is_bankrupt |= newly_bankrupt
         return self.is_bankrupt
 
-class Resource:
-    def __init__(self, resource_id):
-        self.resource_id = resource_id
-        self.capacity = RESOURCE_CAPACITY
-        self.current_load = 0.0
-        self.price = BASE_RESOURCE_COST
-        logging.debug(f"Resource {self.resource_id} created with capacity {self.capacity} and price {self.price}")
+    def _move(self, source, target):
+        for array in (self._agent_id, self._ctx_balance, self._resource_demand_preference, self._demand_multiplier, self._is_bankrupt):
+            array[target] = array[source]
+        self.slot_of[self._agent_id[target]] = target
+
+    def remove(self, slot):
+        removed_id = self._agent_id[slot]
+        hole = slot
+        for k in range(int(np.searchsorted(self.block_end, slot, side='right')), len(self.block_end)):
+            last = self.block_end[k] - 1
+            if last != hole:
+                self._move(last, hole)
+            hole = last
+            self.block_end[k] = last
+        self.slot_of[removed_id] = -1
+        self.alive[removed_id] = False
+        self.size -= 1
+
+    def remove_bankrupt(self, step_num):
+        # Highest slots first, so a row swapped in from the end is never still pending removal
+        for slot in np.flatnonzero(self.is_bankrupt)[::-1]:
+            self.bankruptcy_log.append((step_num, int(self._agent_id[slot]), float(self._ctx_balance[slot])))
+            self.remove(slot)
+
+class ResourcePool:
+    """Array-backed resource state: capacity, load and price per resource."""
+
+    def __init__(self, config):
+        self.config = config
+        num_resources = config.num_resources
+        self.capacity = np.full(num_resources, float(config.resource_capacity))
+        self.current_load = np.zeros(num_resources)
+        self.price = np.full(num_resources, float(config.base_resource_cost))
+        self.clearing_iterations = 0
+        self.clearing_failures = 0  # Steps where clear_market hit its iteration cap
+        logging.debug(f"Created {num_resources} resources with capacity {config.resource_capacity} and price {config.base_resource_cost}")
+
+    def __len__(self):
+        return len(self.capacity)
 
     def update_price(self):
         demand_ratio = self.current_load / self.capacity
-        self.price = BASE_RESOURCE_COST * (1 + demand_ratio * PRICE_ELASTICITY)
+        self.price = self.config.base_resource_cost * (1 + demand_ratio * self.config.price_elasticity)
 
-    def allocate(self, amount):
-        allocated = min(amount, self.capacity - self.current_load)
-        self.current_load += allocated
-        return allocated
-
-    def deallocate(self, amount):
-        self.current_load -= min(amount, self.current_load)
+    def deallocate(self, amounts):
+        self.current_load -= np.minimum(amounts, self.current_load)
 
     def regenerate(self, avg_agent_balance):
-         self.capacity = min(MAX_RESOURCE_CAPACITY, self.capacity * (1 + RESOURCE_REGEN_RATE + DYNAMIC_REGEN_MULTIPLIER * avg_agent_balance))
+        config = self.config
+        growth = 1 + config.resource_regen_rate + config.dynamic_regen_multiplier * avg_agent_balance
+        self.capacity = np.minimum(config.max_resource_capacity, self.capacity * growth)
 
     def adjust_capacity(self, total_economic_output):
-        self.capacity = min(MAX_RESOURCE_CAPACITY, self.capacity * (1 + RESOURCE_CAPACITY_MULTIPLIER * total_economic_output))
+        config = self.config
+        growth = 1 + config.resource_capacity_multiplier * total_economic_output
+        self.capacity = np.minimum(config.max_resource_capacity, self.capacity * growth)
 
 # --- Helper Functions ---
 def update_resource_prices(resources):
-    for resource in resources:
-        resource.update_price()
+    resources.update_price()
 
 def get_resource_prices(resources):
-    return np.array([r.price for r in resources])
+    return resources.price.copy()
 
 def get_resource_availability(resources):
-    return np.array([r.capacity - r.current_load for r in resources])
+    return resources.capacity - resources.current_load
 
 def get_agent_requests(agents, resource_prices, resource_availability):
-    active_agents = [agent for agent in agents if not agent.is_bankrupt]
-    all_requests = []
-    for agent in active_agents:
-        agent_requests = agent.request_resources(resource_prices, resource_availability)
-        all_requests.extend([(agent, resource_id, amount) for resource_id, amount in agent_requests])
-    random.shuffle(all_requests)
-    return all_requests
-
-def allocate_resources(resources, requests):
-    for agent, resource_id, amount in requests:
-        resource = resources[resource_id]
-        allocated = resource.allocate(amount)
-        cost = allocated * resource.price
-        if agent.ctx_balance >= cost:
-            agent.ctx_balance -= cost
+    # Demand matrix (agents x resources); zero where an agent makes no request
+    return agents.request_resources(resource_prices, resource_availability)
+
+# --- Market Clearing ---
+def clear_market(agents, resources):
+    """Solve for per-resource clearing prices at once; returns (prices, iterations, converged).
+
+    Each resource's aggregate demand depends only on its own price and falls as
+    the price rises, so all resources are bracketed and bisected together: every
+    iteration is one vectorized demand evaluation over agents x resources.
+    Resources already in excess supply at the price floor (base_resource_cost)
+    stay there. Iteration stops once every resource's relative excess demand,
+    or its bracket width, is within tolerance; `converged` is then True and no
+    returned price leaves excess demand above tolerance. If the iteration cap
+    stops the search first, `converged` is False: a resource whose bracket was
+    still growing keeps its last upper bound, which may leave excess demand.
+    """
+    config = agents.config
+    tolerance = config.market_clearing_tolerance
+    availability = np.maximum(get_resource_availability(resources), 0.0)
+    scale = np.maximum(availability, 1e-9)
+
+    def excess_demand(prices):
+        # Uncapped demand: capping requests at availability would hide the excess
+        return (agents.request_resources(prices, np.inf).sum(axis=0) - availability) / scale
+
+    low = np.full(len(resources), float(config.base_resource_cost))
+    high = np.maximum(resources.price, low)
+    iterations = 1
+    unresolved = excess_demand(low) > tolerance
+    high[~unresolved] = low[~unresolved]
+
+    # Grow the upper bracket until demand no longer exceeds supply
+    short = unresolved & (excess_demand(high) > tolerance)
+    while short.any() and iterations < config.market_clearing_max_iterations:
+        low[short] = high[short]
+        high[short] *= 2.0
+        short &= excess_demand(high) > tolerance
+        iterations += 1
+
+    while iterations < config.market_clearing_max_iterations:
+        unresolved &= (high - low) > tolerance * high
+        if not unresolved.any():
+            break
+        mid = np.where(unresolved, 0.5 * (low + high), high)
+        excess = excess_demand(mid)
+        iterations += 1
+        cleared = unresolved & (np.abs(excess) <= tolerance)
+        low = np.where(unresolved & (excess > tolerance), mid, low)
+        high = np.where(unresolved & (excess <= tolerance), mid, high)
+        unresolved &= ~cleared
+    converged = not (short.any() or (unresolved & ((high - low) > tolerance * high)).any())
+    return high, iterations, converged
+
+# --- Allocation Kernels ---
+# Each kernel takes the agents x resources demand matrix and per-resource
+# availability and returns the filled amounts in the same shape.
+def allocate_first_come(demand, availability, priority):
+    """Fill requests in `priority` order (a permutation of agents) until each resource runs out."""
+    ordered = demand[priority]
+    filled_before = np.cumsum(ordered, axis=0) - ordered
+    fills = np.empty_like(demand)
+    fills[priority] = np.clip(availability - filled_before, 0.0, ordered)
+    return fills
+
+def allocate_pro_rata(demand, availability):
+    """Scale every request on an oversubscribed resource by the same fraction."""
+    total_demand = demand.sum(axis=0)
+    ratio = np.divide(availability, total_demand, out=np.ones_like(total_demand), where=total_demand > 0)
+    return demand * np.minimum(ratio, 1.0)
+
+def allocate_auction(demand, availability, bids):
+    """Uniform-price auction per resource; returns fills and the clearing bid.
+
+    Highest bids fill first. The clearing bid is the bid of the first request that
+    could not be filled completely, or zero when every request is served.
+    """
+    if demand.shape[0] == 0:
+        return np.zeros_like(demand), np.zeros(demand.shape[1])
+    order = np.argsort(-bids, axis=0, kind='stable')
+    ordered = np.take_along_axis(demand, order, axis=0)
+    filled_before = np.cumsum(ordered, axis=0) - ordered
+    ordered_fills = np.clip(availability - filled_before, 0.0, ordered)
+
+    rejected = (ordered_fills < ordered) & (ordered > 0)
+    first_rejected = np.argmax(rejected, axis=0)
+    ordered_bids = np.take_along_axis(bids, order, axis=0)
+    clearing_bid = np.where(rejected.any(axis=0), ordered_bids[first_rejected, np.arange(demand.shape[1])], 0.0)
+
+    fills = np.empty_like(demand)
+    np.put_along_axis(fills, order, ordered_fills, axis=0)
+    return fills, clearing_bid
+
+def charge_agents(agents, fills, unit_prices):
+    # Charges are applied resource by resource; an agent skips charges once its balance runs out
+    cost = fills * unit_prices
+    paid = np.cumsum(cost, axis=1) <= agents.ctx_balance[:, None]
+    agents.ctx_balance -= np.sum(np.where(paid, cost, 0.0), axis=1)
+
+def allocate_resources(resources, agents, requests, policy=None):
+    policy = policy or agents.config.allocation_policy
+    availability = np.maximum(get_resource_availability(resources), 0.0)
+    if policy == 'first_come':
+        fills = allocate_first_come(requests, availability, agents.rng.permutation(len(agents)))
+        unit_prices = resources.price
+    elif policy == 'pro_rata':
+        fills = allocate_pro_rata(requests, availability)
+        unit_prices = resources.price
+    elif policy == 'auction':
+        # Willingness to pay per unit: the price at which the archetype's demand reaches zero, scaled by preference
+        choke_price = agents.config.base_resource_cost * agents._per_agent('choke_price')
+        bids = choke_price[:, None] * agents.resource_demand_preference
+        fills, clearing_bid = allocate_auction(requests, availability, bids)
+        unit_prices = np.maximum(resources.price, clearing_bid)
+    else:
+        raise ValueError(f"Invalid allocation policy: {policy}")
+
+    resources.current_load += fills.sum(axis=0)
+    charge_agents(agents, fills, unit_prices)
+    return fills
 
 def deallocate_resources(resources):
-    for resource in resources:
-        deallocate_amount = resource.current_load * DEALLOCATION_RATE
-        resource.deallocate(deallocate_amount)
+    resources.deallocate(resources.current_load * resources.config.deallocation_rate)
 
 def regenerate_resources(resources, avg_agent_balance):
-    for resource in resources:
-        resource.regenerate(avg_agent_balance)
+    resources.regenerate(avg_agent_balance)
 
 def adjust_agent_needs(agents):
-    for agent in agents:
-        agent.adjust_needs()
+    agents.adjust_needs()
 
 def adjust_agent_demand_multiplier(agents, step_num):
-    for agent in agents:
-        agent.adjust_demand_multiplier(step_num)
+    agents.adjust_demand_multiplier(step_num)
 
 def add_agent_income(agents, avg_resource_price):
-    for agent in agents:
-        agent.add_income(avg_resource_price)
+    agents.add_income(avg_resource_price)
 
 def add_agent_expense(agents):
-    for agent in agents:
-        agent.add_expense()
+    agents.add_expense()
 
 def check_agent_bankruptcies(agents):
-    bankrupt_agents = []
-    for agent in agents:
-        if agent.check_bankrupt():
-            bankrupt_agents.append(agent)
-    return bankrupt_agents
+    return agents.check_bankrupt()
 
 def tax_agents(agents, tax_rate, resources):
-    total_taxes = 0
-    for agent in agents:
-        tax_amount = agent.ctx_balance * tax_rate
-        agent.tax(tax_amount)
-        total_taxes += tax_amount
-    return total_taxes
+    return agents.tax(tax_rate)
 
 def redistribute_wealth(agents, total_taxes, resources):
-    active_agents = [agent for agent in agents if not agent.is_bankrupt]
-    if len(active_agents) > 0:
-        redistribution_per_agent = total_taxes / len(active_agents)
-        for agent in active_agents:
-            agent.ctx_balance += redistribution_per_agent
+    active = ~agents.is_bankrupt
+    num_active = np.count_nonzero(active)
+    if num_active > 0:
+        agents.ctx_balance[active] += total_taxes / num_active
 
 def adjust_resource_capacity(resources, total_economic_output):
-    for resource in resources:
-      resource.adjust_capacity(total_economic_output)
+    resources.adjust_capacity(total_economic_output)
 
 def get_agent_balances(agents):
-    return [agent.ctx_balance for agent in agents]
+    return agents.ctx_balance.copy()
 
 def get_resource_load_and_prices(resources):
-    return [r.price for r in resources], [r.current_load for r in resources]
+    return resources.price.copy(), resources.current_load.copy()
 
 def get_total_economic_output(agents, resources):
-    total_balances = sum(get_agent_balances(agents))
-    resource_prices = get_resource_prices(resources)
-    resource_load, _ = get_resource_load_and_prices(resources)
-    total_resource_value = sum(resource_prices * resource_load)
+    total_balances = agents.ctx_balance.sum()
+    total_resource_value = np.sum(resources.price * resources.current_load)
     return total_balances + total_resource_value
 
+# --- Inequality Tracking ---
 def calculate_gini_coefficient(balances):
-    balances = sorted(balances)
+    balances = np.sort(np.asarray(balances, dtype=np.float64))
     n = len(balances)
     if n < 2:
         return 0.0
-    numerator = sum((i + 1) * balance for i, balance in enumerate(balances)) - sum((n - i) * balance for i, balance in enumerate(balances))
-    denominator = n * sum(balances)
-    return numerator / denominator if denominator else 0.0
+    denominator = n * balances.sum()
+    if not denominator:
+        return 0.0
+    return float(np.sum((2 * np.arange(1, n + 1) - n - 1) * balances) / denominator)
+
+def _theil_index(n, total, sum_x_log_x):
+    # Non-positive balances contribute zero (the x*ln(x) -> 0 limit)
+    if n == 0 or total <= 0:
+        return 0.0
+    mean = total / n
+    return float(sum_x_log_x / total - np.log(mean))
+
+def exact_inequality(balances, top_k=INEQUALITY_TOP_K):
+    """Gini, top-k share and Theil index from a full sort."""
+    balances = np.sort(np.asarray(balances, dtype=np.float64))
+    total = balances.sum()
+    positive = balances[balances > 0]
+    return {
+        'gini': calculate_gini_coefficient(balances),
+        'top_k_share': float(balances[-top_k:].sum() / total) if total else 0.0,
+        'theil': _theil_index(len(balances), total, np.sum(positive * np.log(positive))),
+    }
+
+# --- Phase Profiling ---
+class PhaseTimer:
+    """Per-phase wall time (ns) and call counts, in total and per window of steps.
+
+    Phase names are ';'-separated stacks (e.g. "run_simulation;simulation_step;allocate_resources"),
+    so the totals can be written directly as a collapsed-stack flamegraph file.
+    """
+
+    def __init__(self, window=PROFILE_WINDOW):
+        self.window = window
+        self.total_ns = {}
+        self.calls = {}
+        self.window_ns = {}
+        self.window_calls = {}
+        self.windows = []  # (last step, {phase: ns}, {phase: calls})
+
+    def call(self, name, fn, *args):
+        start = time.perf_counter_ns()
+        result = fn(*args)
+        elapsed = time.perf_counter_ns() - start
+        self.total_ns[name] = self.total_ns.get(name, 0) + elapsed
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.window_ns[name] = self.window_ns.get(name, 0) + elapsed
+        self.window_calls[name] = self.window_calls.get(name, 0) + 1
+        return result
+
+    def _close_window(self, step):
+        self.windows.append((step, self.window_ns, self.window_calls))
+        self.window_ns = {}
+        self.window_calls = {}
+
+    def end_step(self, step):
+        if (step + 1) % self.window == 0:
+            self._close_window(step)
+
+    def finish(self, step):
+        """Close the last, partial window; `step` is the last step run."""
+        if self.window_ns:
+            self._close_window(step)
+
+    def summary(self):
+        total = sum(self.total_ns.values()) or 1
+        width = max([len('phase')] + [len(name) for name in self.total_ns])
+        lines = [f"{'phase':<{width}} {'calls':>9} {'total ms':>11} {'mean us':>10} {'share':>7}"]
+        for name, ns in sorted(self.total_ns.items(), key=lambda item: -item[1]):
+            calls = self.calls[name]
+            lines.append(f"{name:<{width}} {calls:>9} {ns / 1e6:>11.2f} {ns / calls / 1e3:>10.2f} {ns / total:>7.1%}")
+        return "\n".join(lines)
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as f:
+            for name, ns in sorted(self.total_ns.items()):
+                f.write(f"{name} {ns}\n")
+
+class _NullTimer:
+    def call(self, name, fn, *args):
+        return fn(*args)
+
+    def end_step(self, step):
+        pass
+
+    def finish(self, step):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+# --- Time Series Recording ---
+class TimeSeriesRecorder:
+    """Per-resource price/load/capacity and balance quantiles every `stride` steps.
+
+    Rows go into preallocated arrays, memory-mapped .npy files when `path` is a
+    directory, or a fixed-size buffer flushed as Parquet row groups when `path`
+    ends in .parquet, so the latter two keep resident memory independent of the
+    run length.
+    """
+
+    def __init__(self, num_steps, num_resources, stride=TIMESERIES_STRIDE, quantiles=TIMESERIES_QUANTILES, path=None, chunk_rows=TIMESERIES_CHUNK_ROWS):
+        self.stride = max(1, int(stride))
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        self.num_rows = -(-num_steps // self.stride)
+        self.rows_written = 0
+        self.path = path
+        self.parquet = path is not None and path.endswith('.parquet')
+        if self.parquet and pq is None:
+            raise ImportError("pyarrow is required to write Parquet time series")
+        self._writer = None
+        self._pending = 0
+
+        shapes = {
+            'step': ((), np.int64),
+            'price': ((num_resources,), np.float32),
+            'load': ((num_resources,), np.float32),
+            'capacity': ((num_resources,), np.float32),
+            'balance_quantiles': ((len(self.quantiles),), np.float32),
+        }
+        rows = min(chunk_rows, self.num_rows) if self.parquet else self.num_rows
+        self.buffers = {}
+        if path is not None and not self.parquet:
+            os.makedirs(path, exist_ok=True)
+        for name, (shape, dtype) in shapes.items():
+            if path is None or self.parquet:
+                self.buffers[name] = np.zeros((rows,) + shape, dtype=dtype)
+            else:
+                self.buffers[name] = np.lib.format.open_memmap(os.path.join(path, f'{name}.npy'), mode='w+', dtype=dtype, shape=(rows,) + shape)
+
+    def record(self, step, resources, balances):
+        if step % self.stride:
+            return
+        row = self._pending if self.parquet else self.rows_written
+        buffers = self.buffers
+        buffers['step'][row] = step
+        buffers['price'][row] = resources.price
+        buffers['load'][row] = resources.current_load
+        buffers['capacity'][row] = resources.capacity
+        buffers['balance_quantiles'][row] = np.quantile(balances, self.quantiles) if len(balances) else np.nan
+        self.rows_written += 1
+        if self.parquet:
+            self._pending += 1
+            if self._pending == len(buffers['step']):
+                self.flush()
+
+    def _row_group(self):
+        n = self._pending
+        columns = {'step': self.buffers['step'][:n]}
+        for name in ('price', 'load', 'capacity'):
+            for i in range(self.buffers[name].shape[1]):
+                columns[f'{name}_{i}'] = self.buffers[name][:n, i]
+        for i, q in enumerate(self.quantiles):
+            columns[f'balance_q{q:g}'] = self.buffers['balance_quantiles'][:n, i]
+        return pa.table(columns)
+
+    def flush(self):
+        if self.parquet:
+            if self._pending:
+                table = self._row_group()
+                if self._writer is None:
+                    self._writer = pq.ParquetWriter(self.path, table.schema)
+                self._writer.write_table(table)
+                self._pending = 0
+            return
+        for buffer in self.buffers.values():
+            if isinstance(buffer, np.memmap):
+                buffer.flush()
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def arrays(self):
+        """Recorded rows as arrays; Parquet output is returned by path instead."""
+        if self.parquet:
+            return {'path': self.path}
+        return {name: buffer[:self.rows_written] for name, buffer in self.buffers.items()}
 
 # --- Simulation Step ---
-def simulation_step(agents, resources, step_num):
-    update_resource_prices(resources)
+def simulation_step(agents, resources, step_num, timer=None):
+    timer = timer or _NULL_TIMER
+    phase = 'run_simulation;simulation_step;'
+    timer.call(phase + 'update_resource_prices', update_resource_prices, resources)
+    if resources.config.market_clearing:
+        resources.price, resources.clearing_iterations, converged = timer.call(phase + 'clear_market', clear_market, agents, resources)
+        if not converged:
+            resources.clearing_failures += 1
+            if resources.clearing_failures == 1:
+                logging.warning(f"Market clearing did not converge within {resources.config.market_clearing_max_iterations} "
+                                f"iterations at step {step_num}; prices may leave excess demand.")
     resource_prices = get_resource_prices(resources)
     resource_availability = get_resource_availability(resources)
     avg_resource_price = np.mean(resource_prices)
     avg_agent_balance = np.mean(get_agent_balances(agents))
-    all_requests = get_agent_requests(agents, resource_prices, resource_availability)
-    allocate_resources(resources, all_requests)
-    deallocate_resources(resources)
-    regenerate_resources(resources, avg_agent_balance)
-    total_economic_output = get_total_economic_output(agents, resources)
-    adjust_resource_capacity(resources, total_economic_output)
-    adjust_agent_needs(agents)
-    adjust_agent_demand_multiplier(agents, step_num)
-    add_agent_income(agents, avg_resource_price)
-    add_agent_expense(agents)
-    total_taxes = tax_agents(agents, TAX_RATE, resources)
-    redistribute_wealth(agents, total_taxes, resources)
-    bankrupt_agents = check_agent_bankruptcies(agents)
-    agents[:] = [agent for agent in agents if agent not in bankrupt_agents]
+    all_requests = timer.call(phase + 'get_agent_requests', get_agent_requests, agents, resource_prices, resource_availability)
+    timer.call(phase + 'allocate_resources', allocate_resources, resources, agents, all_requests)
+    timer.call(phase + 'deallocate_resources', deallocate_resources, resources)
+    timer.call(phase + 'regenerate_resources', regenerate_resources, resources, avg_agent_balance)
+    total_economic_output = timer.call(phase + 'get_total_economic_output', get_total_economic_output, agents, resources)
+    timer.call(phase + 'adjust_resource_capacity', adjust_resource_capacity, resources, total_economic_output)
+    timer.call(phase + 'adjust_agent_needs', adjust_agent_needs, agents)
+    timer.call(phase + 'adjust_agent_demand_multiplier', adjust_agent_demand_multiplier, agents, step_num)
+    timer.call(phase + 'add_agent_income', add_agent_income, agents, avg_resource_price)
+    timer.call(phase + 'add_agent_expense', add_agent_expense, agents)
+    total_taxes = timer.call(phase + 'tax_agents', tax_agents, agents, agents.config.tax_rate, resources)
+    timer.call(phase + 'redistribute_wealth', redistribute_wealth, agents, total_taxes, resources)
+    timer.call(phase + 'check_agent_bankruptcies', check_agent_bankruptcies, agents)
+    timer.call(phase + 'remove_bankrupt', agents.remove_bankrupt, step_num)
     resource_prices_debug, resource_loads_debug = get_resource_load_and_prices(resources)
     return resource_prices, get_agent_balances(agents), resource_prices_debug, resource_loads_debug
 
-def run_simulation(params):
-    global PRICE_ELASTICITY, RESOURCE_REGEN_RATE, TAX_RATE, INITIAL_IMBALANCE, IMBALANCE_STRENGTH, SIMULATION_STEPS, NUM_AGENTS, AGENT_EXPENSE_RATE
-    original_price_elasticity = PRICE_ELASTICITY
-    original_resource_regen_rate = RESOURCE_REGEN_RATE
-    original_tax_rate = TAX_RATE
-    original_initial_imbalance = INITIAL_IMBALANCE
-    original_imbalance_strength = IMBALANCE_STRENGTH
-    original_simulation_steps = SIMULATION_STEPS
-    original_num_agents = NUM_AGENTS
-    original_agent_expense_rate = AGENT_EXPENSE_RATE
-
-    num_agents = params.get('num_agents', NUM_AGENTS)
-    simulation_steps = params.get('simulation_steps', SIMULATION_STEPS)
-    price_elasticity = params.get('price_elasticity', PRICE_ELASTICITY)
-    resource_regen_rate = params.get('resource_regen_rate', RESOURCE_REGEN_RATE)
-    tax_rate = params.get('tax_rate', TAX_RATE)
-    initial_imbalance = params.get('initial_imbalance', INITIAL_IMBALANCE)
-    imbalance_strength = params.get('imbalance_strength', IMBALANCE_STRENGTH)
-    agent_expense_rate = params.get('agent_expense_rate', AGENT_EXPENSE_RATE)
-
-    PRICE_ELASTICITY = price_elasticity
-    RESOURCE_REGEN_RATE = resource_regen_rate
-    TAX_RATE = tax_rate
-    INITIAL_IMBALANCE = initial_imbalance
-    IMBALANCE_STRENGTH = imbalance_strength
-    SIMULATION_STEPS = simulation_steps
-    NUM_AGENTS = num_agents
-    AGENT_EXPENSE_RATE = agent_expense_rate
-
-    agents_list = [Agent(i) for i in range(num_agents)]
-    resources_list = [Resource(i) for i in range(NUM_RESOURCES)]
-
-    if INITIAL_IMBALANCE:
-        for agent in agents_list:
-            if agent.agent_id < NUM_AGENTS * IMBALANCE_STRENGTH:
-                agent.ctx_balance *= 2
-            else:
-                agent.ctx_balance *= 0.5
-
-    agent_balances_history = []
-    resource_prices_history = []
-
-    for step in range(SIMULATION_STEPS):
-        resource_prices, agent_balances, _, _ = simulation_step(agents_list, resources_list, step)
-        agent_balances_history.append(agent_balances)
-        resource_prices_history.append(resource_prices)
+def run_simulation(params, config=None):
+    """Run one simulation; `params` overrides fields of `config` (default SimulationConfig())."""
+    config = (config or SimulationConfig()).replace(**params)
+    rng = np.random.default_rng(config.seed)
+
+    agents_list = AgentPool(config, rng)
+    resources_list = ResourcePool(config)
+
+    if config.initial_imbalance:
+        agents_list.apply_imbalance(config.imbalance_strength)
+
+    timeseries = TimeSeriesRecorder(config.simulation_steps, config.num_resources, config.timeseries_stride, path=config.timeseries_path)
+    resource_prices = np.full(config.num_resources, np.nan)
+    gini_history = np.zeros(config.simulation_steps)
+    inequality_checkpoints = []
+    timer = PhaseTimer(config.profile_window) if config.profile_phases else _NULL_TIMER
+
+    for step in range(config.simulation_steps):
+        resource_prices, agent_balances, _, _ = simulation_step(agents_list, resources_list, step, timer)
+        timer.call('run_simulation;record_timeseries', timeseries.record, step, resources_list, agent_balances)
+        gini_history[step] = timer.call('run_simulation;track_inequality', calculate_gini_coefficient, agent_balances)
+        if (step + 1) % INEQUALITY_CHECKPOINT_STRIDE == 0:
+            inequality_checkpoints.append((step, exact_inequality(agents_list.ctx_balance)))
+        timer.end_step(step)
+    timer.finish(config.simulation_steps - 1)
+    timeseries.close()
+
+    if config.profile_phases:
+        # Printed rather than logged: the module logs at WARNING level
+        print("Phase timings:\n" + timer.summary())
+        if config.profile_path:
+            timer.write_collapsed(config.profile_path)
 
     final_balances = get_agent_balances(agents_list)
     avg_final_balance = np.mean(final_balances)
     gini_coefficient = calculate_gini_coefficient(final_balances)
-    num_bankruptcies = original_num_agents - len(agents_list)
-    avg_final_resource_price = np.mean(resource_prices_history[-1]) if resource_prices_history else np.nan
-
-    PRICE_ELASTICITY = original_price_elasticity
-    RESOURCE_REGEN_RATE = original_resource_regen_rate
-    TAX_RATE = original_tax_rate
-    INITIAL_IMBALANCE = original_initial_imbalance
-    IMBALANCE_STRENGTH = original_imbalance_strength
-    SIMULATION_STEPS = original_simulation_steps
-    NUM_AGENTS = original_num_agents
-    AGENT_EXPENSE_RATE = original_agent_expense_rate
+    num_bankruptcies = config.num_agents - len(agents_list)
+    avg_final_resource_price = np.mean(resource_prices)
 
     return {
         'avg_final_balance': avg_final_balance,
         'gini_coefficient': gini_coefficient,
         'num_bankruptcies': num_bankruptcies,
-        'avg_final_resource_price': avg_final_resource_price
+        'avg_final_resource_price': avg_final_resource_price,
+        'clearing_failures': resources_list.clearing_failures,
+        'bankruptcy_log': agents_list.bankruptcy_log,
+        'gini_history': gini_history,
+        'inequality_checkpoints': inequality_checkpoints,
+        'timeseries': timeseries.arrays(),
+        'phase_timer': timer if config.profile_phases else None
     }
 
-# --- Parameter Experimentation ---
-logging.info("Starting parameter experimentation...")
-
-param_ranges = {
-    'price_elasticity': np.linspace(0.01, 0.1, 10),
-    'resource_regen_rate': np.linspace(0.005, 0.02, 10),
-    'tax_rate': np.linspace(0.0, 0.05, 10),
-    'agent_expense_rate': np.linspace(0.1, 0.5, 10)
-}
+def run_parameter_sweep(param_sets, max_workers=None, use_processes=True, config=None):
+    """Run `run_simulation` for every params dict in a pool; yields (params, results) as runs finish."""
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_simulation, params, config): params for params in param_sets}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+# --- Sweep Designs ---
+def _scale_design(unit_samples, bounds):
+    names = list(bounds)
+    low = np.array([bounds[name][0] for name in names])
+    high = np.array([bounds[name][1] for name in names])
+    values = low + unit_samples * (high - low)
+    return [{name: float(v) for name, v in zip(names, row)} for row in values]
+
+def full_factorial_design(bounds=SWEEP_BOUNDS, levels=5):
+    grids = [np.linspace(low, high, levels) for low, high in bounds.values()]
+    return [{name: float(v) for name, v in zip(bounds, combo)} for combo in itertools.product(*grids)]
+
+def latin_hypercube_design(bounds=SWEEP_BOUNDS, num_samples=50, rng=None):
+    rng = rng or np.random.default_rng()
+    d = len(bounds)
+    strata = np.argsort(rng.random((d, num_samples)), axis=1).T  # one random permutation per column
+    unit_samples = (strata + rng.random((num_samples, d))) / num_samples
+    return _scale_design(unit_samples, bounds)
+
+def sobol_design(bounds=SWEEP_BOUNDS, num_samples=SWEEP_SOBOL_SAMPLES, rng=None):
+    """Saltelli design: rows are A, B, then A with column i taken from B for each parameter i."""
+    rng = rng or np.random.default_rng()
+    d = len(bounds)
+    if qmc is not None:
+        base = qmc.Sobol(d=2 * d, scramble=True, seed=rng).random(num_samples)
+    else:
+        base = rng.random((num_samples, 2 * d))
+    a, b = base[:, :d], base[:, d:]
+    blocks = [a, b]
+    for i in range(d):
+        ab = a.copy()
+        ab[:, i] = b[:, i]
+        blocks.append(ab)
+    return _scale_design(np.vstack(blocks), bounds)
+
+def sobol_indices(outputs, num_params):
+    """First-order (Saltelli 2010) and total (Jansen) indices from outputs ordered as in `sobol_design`."""
+    blocks = np.asarray(outputs, dtype=np.float64).reshape(num_params + 2, -1)
+    f_a, f_b, f_ab = blocks[0], blocks[1], blocks[2:]
+    variance = np.nanvar(np.concatenate([f_a, f_b]))
+    if not variance > 0:
+        return np.zeros(num_params), np.zeros(num_params)
+    first_order = np.nanmean(f_b * (f_ab - f_a), axis=1) / variance
+    total = 0.5 * np.nanmean((f_a - f_ab) ** 2, axis=1) / variance
+    return first_order, total
+
+# --- Sweep Runner ---
+def sweep_run_key(params, config=None):
+    """Digest of the full effective config of one run; checkpoint records are reused only when it matches."""
+    effective = (config or SimulationConfig()).replace(**params)
+    payload = json.dumps(dataclasses.asdict(effective), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def _load_sweep_checkpoint(path, keys):
+    done = {}
+    stale = 0
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    index = record['index']
+                    if index < len(keys) and record.get('key') == keys[index]:
+                        done[index] = record['metrics']
+                    else:
+                        stale += 1
+    if stale:
+        logging.warning(f"Ignoring {stale} checkpoint records in {path} that do not match the current design or config")
+    return done
+
+def run_sweep(param_sets, checkpoint_path=None, config=None, max_workers=None, use_processes=True, metrics=SWEEP_METRICS):
+    """Run a design and return an (n_runs, n_metrics) array.
+
+    Each finished run is appended to `checkpoint_path` (JSON lines) with a
+    digest of its effective config, so an interrupted sweep resumes by
+    skipping matching records and re-runs any whose design row or config changed.
+    """
+    keys = [sweep_run_key(params, config) for params in param_sets]
+    done = _load_sweep_checkpoint(checkpoint_path, keys)
+    done = {i: record for i, record in done.items() if all(name in record for name in metrics)}
+    pending = [params for i, params in enumerate(param_sets) if i not in done]
+    index_of = {id(params): i for i, params in enumerate(param_sets)}
+    if done:
+        logging.info(f"Resuming sweep: {len(done)} of {len(param_sets)} runs already checkpointed")
+
+    checkpoint = open(checkpoint_path, 'a') if checkpoint_path else None
+    try:
+        for params, results in run_parameter_sweep(pending, max_workers, use_processes, config):
+            index = index_of[id(params)]
+            done[index] = {name: float(results[name]) for name in metrics}
+            if checkpoint:
+                checkpoint.write(json.dumps({'index': index, 'key': keys[index], 'params': params, 'metrics': done[index]}) + "\n")
+                checkpoint.flush()
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    return np.array([[done[i][name] for name in metrics] for i in range(len(param_sets))])
+
+if __name__ == "__main__":
+    # --- Parameter Experimentation ---
+    logging.info("Starting parameter experimentation...")
+
+    param_ranges = {
+        'price_elasticity': np.linspace(0.01, 0.1, 10),
+        'resource_regen_rate': np.linspace(0.005, 0.02, 10),
+        'tax_rate': np.linspace(0.0, 0.05, 10),
+        'agent_expense_rate': np.linspace(0.1, 0.5, 10)
+    }
 
-experiment_results = {}
+    experiment_results = {param_name: [] for param_name in param_ranges}
+    param_sets = [{param_name: float(value)} for param_name, param_values in param_ranges.items() for value in param_values]
 
-for param_name, param_values in param_ranges.items():
-    logging.info(f"Experimenting with {param_name}...")
-    experiment_results[param_name] = []
-    for value in param_values:
-        params = {param_name: value}
-        logging.info(f"Running simulation with {param_name} = {value}")
-        results = run_simulation(params)
+    for params, results in run_parameter_sweep(param_sets):
+        (param_name, value), = params.items()
+        logging.info(f"Finished simulation with {param_name} = {value}")
         results['param_value'] = value
         experiment_results[param_name].append(results)
 
-# --- Visualize Results ---
-logging.info("Visualizing results...")
-plt.figure(figsize=(18, 15))
-plot_index = 1
-
-for param_name in param_ranges.keys():
-    param_values = [res['param_value'] for res in experiment_results[param_name]]
-
-    plt.subplot(len(param_ranges), 4, plot_index)
-    avg_balances = [res['avg_final_balance'] for res in experiment_results[param_name]]
-    plt.plot(param_values, avg_balances)
-    plt.title(f"Avg Final Balance vs {param_name}")
-    plt.xlabel(param_name)
-    plt.ylabel("Average Final Balance")
-    plot_index += 1
-
-    plt.subplot(len(param_ranges), 4, plot_index)
-    gini_coeffs = [res['gini_coefficient'] for res in experiment_results[param_name]]
-    plt.plot(param_values, gini_coeffs)
-    plt.title(f"Gini Coefficient vs {param_name}")
-    plt.xlabel(param_name)
-    plt.ylabel("Gini Coefficient")
-    plot_index += 1
-
-    plt.subplot(len(param_ranges), 4, plot_index)
-    bankruptcies = [res['num_bankruptcies'] for res in experiment_results[param_name]]
-    plt.plot(param_values, bankruptcies)
-    plt.title(f"Number of Bankruptcies vs {param_name}")
-    plt.xlabel(param_name)
-    plt.ylabel("Number of Bankruptcies")
-    plot_index += 1
-
-    plt.subplot(len(param_ranges), 4, plot_index)
-    avg_resource_prices = [res['avg_final_resource_price'] for res in experiment_results[param_name]]
-    plt.plot(param_values, avg_resource_prices)
-    plt.title(f"Avg Final Resource Price vs {param_name}")
-    plt.xlabel(param_name)
-    plt.ylabel("Average Final Resource Price")
-    plot_index += 1
-
-plt.tight_layout()
-plt.savefig("parameter_impact.png")
-logging.info("Parameter impact plots saved to parameter_impact.png")
-
-# --- Further Analysis (Example) ---
-logging.info("Performing further analysis...")
-
-if 'tax_rate' in experiment_results:
-    tax_results = experiment_results['tax_rate']
-    best_tax_rate_data = min(tax_results, key=lambda x: x['num_bankruptcies'])
-    logging.info(f"Tax rate that minimizes bankruptcies: {best_tax_rate_data['param_value']}")
-
-if 'resource_regen_rate' in experiment_results:
-    regen_results = experiment_results['resource_regen_rate']
-    best_regen_rate_data = max(regen_results, key=lambda x: x['avg_final_balance'])
-    logging.info(f"Regen rate that maximizes average final balance: {best_regen_rate_data['param_value']}")
-
-logging.info("Experimentation and analysis complete.")
\ No newline at end of file
+    for runs in experiment_results.values():
+        runs.sort(key=lambda results: results['param_value'])
+
+    # --- Visualize Results ---
+    logging.info("Visualizing results...")
+    plt.figure(figsize=(18, 15))
+    plot_index = 1
+
+    for param_name in param_ranges.keys():
+        param_values = [res['param_value'] for res in experiment_results[param_name]]
+
+        plt.subplot(len(param_ranges), 4, plot_index)
+        avg_balances = [res['avg_final_balance'] for res in experiment_results[param_name]]
+        plt.plot(param_values, avg_balances)
+        plt.title(f"Avg Final Balance vs {param_name}")
+        plt.xlabel(param_name)
+        plt.ylabel("Average Final Balance")
+        plot_index += 1
+
+        plt.subplot(len(param_ranges), 4, plot_index)
+        gini_coeffs = [res['gini_coefficient'] for res in experiment_results[param_name]]
+        plt.plot(param_values, gini_coeffs)
+        plt.title(f"Gini Coefficient vs {param_name}")
+        plt.xlabel(param_name)
+        plt.ylabel("Gini Coefficient")
+        plot_index += 1
+
+        plt.subplot(len(param_ranges), 4, plot_index)
+        bankruptcies = [res['num_bankruptcies'] for res in experiment_results[param_name]]
+        plt.plot(param_values, bankruptcies)
+        plt.title(f"Number of Bankruptcies vs {param_name}")
+        plt.xlabel(param_name)
+        plt.ylabel("Number of Bankruptcies")
+        plot_index += 1
+
+        plt.subplot(len(param_ranges), 4, plot_index)
+        avg_resource_prices = [res['avg_final_resource_price'] for res in experiment_results[param_name]]
+        plt.plot(param_values, avg_resource_prices)
+        plt.title(f"Avg Final Resource Price vs {param_name}")
+        plt.xlabel(param_name)
+        plt.ylabel("Average Final Resource Price")
+        plot_index += 1
+
+    plt.tight_layout()
+    plt.savefig("parameter_impact.png")
+    logging.info("Parameter impact plots saved to parameter_impact.png")
+
+    # --- Further Analysis (Example) ---
+    logging.info("Performing further analysis...")
+
+    if 'tax_rate' in experiment_results:
+        tax_results = experiment_results['tax_rate']
+        best_tax_rate_data = min(tax_results, key=lambda x: x['num_bankruptcies'])
+        logging.info(f"Tax rate that minimizes bankruptcies: {best_tax_rate_data['param_value']}")
+
+    if 'resource_regen_rate' in experiment_results:
+        regen_results = experiment_results['resource_regen_rate']
+        best_regen_rate_data = max(regen_results, key=lambda x: x['avg_final_balance'])
+        logging.info(f"Regen rate that maximizes average final balance: {best_regen_rate_data['param_value']}")
+
+    # --- Sensitivity Analysis ---
+    logging.info("Running Sobol sensitivity sweep...")
+    sobol_sets = sobol_design(SWEEP_BOUNDS, SWEEP_SOBOL_SAMPLES, np.random.default_rng(0))
+    sweep_outputs = run_sweep(sobol_sets, checkpoint_path=SWEEP_CHECKPOINT)
+    for column, metric in enumerate(SWEEP_METRICS):
+        first_order, total = sobol_indices(sweep_outputs[:, column], len(SWEEP_BOUNDS))
+        for name, s1, st in zip(SWEEP_BOUNDS, first_order, total):
+            logging.info(f"{metric}: {name} S1={s1:.3f} ST={st:.3f}")
+
+    logging.info("Experimentation and analysis complete.")
\ No newline at end of file